@@ -32,3 +32,7 @@ export const API_SERVER_PORT = Number(process.env.API_SERVER_PORT) || 8386;
 // Ffmpeg
 export const FFMPEG_PATH = process.env.FFMPEG_PATH || 'ffmpeg';
 export const FFPROBE_PATH = process.env.FFPROBE_PATH || 'ffprobe';
+
+// Traffic light phase timeline (served by yolo-server/traffic-light.py)
+export const TRAFFIC_LIGHT_TIMELINE_URL =
+	process.env.TRAFFIC_LIGHT_TIMELINE_URL || 'http://127.0.0.1:8766';
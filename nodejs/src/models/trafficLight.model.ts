@@ -5,7 +5,13 @@ export const TRAFFIC_LIGHT_MODEL_NAME = 'TrafficLight';
 export const TRAFFIC_LIGHT_COLLECTION_NAME = 'traffic_lights';
 
 export const trafficLightSchema = new Schema({
+    cameraId: { type: String },
     traffic_status: { type: String, required: true },
+    // Phase intervals from the debounced tracker: 'transition' opens one, 'heartbeat' extends it
+    event: { type: String, enum: ['frame', 'transition', 'heartbeat'], default: 'frame' },
+    previous_status: { type: String },
+    interval_start: { type: Number },
+    interval_end: { type: Number },
     detections: {
         type: [{
             class: { type: String, required: true },
@@ -35,5 +41,6 @@ export const trafficLightSchema = new Schema({
 });
 
 trafficLightSchema.index({ created_at: -1 }, { expireAfterSeconds: ms('1 hour') / 1000 });
+trafficLightSchema.index({ cameraId: 1, interval_start: -1 });
 
 export default model(TRAFFIC_LIGHT_MODEL_NAME, trafficLightSchema);
\ No newline at end of file
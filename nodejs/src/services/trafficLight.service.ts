@@ -1,8 +1,40 @@
 import { TrafficLightEnum } from "@/enums/trafficLight.enum.js";
 import trafficLightModel from "@/models/trafficLight.model.js";
 import { getTrafficLightStatus } from "@/services/redis.service.js"; // Import Redis
+import { TRAFFIC_LIGHT_TIMELINE_URL } from "@/config/env.config.js";
+
+// An open phase interval is trusted this long past its last heartbeat
+const PHASE_INTERVAL_GRACE_MS = 10000;
+// The timeline is a local in-memory lookup; give up quickly and fall back to MongoDB
+const PHASE_TIMELINE_TIMEOUT_MS = 200;
 
 export default new class TrafficLightService {
+  /**
+   * Light status of a camera at each of times (ms), in one request to the phase timeline.
+   * Times the timeline can't answer (service down, before its retention) fall back to
+   * getTrafficLightByTime.
+   */
+  async getTrafficLightsByTimes(times: number[], cameraId: string) {
+    let statuses: (string | null)[] = times.map(() => null);
+    try {
+      const url = `${TRAFFIC_LIGHT_TIMELINE_URL}/phases/at?camera_id=${encodeURIComponent(cameraId)}&t=${times.join(",")}`;
+      const res = await fetch(url, { signal: AbortSignal.timeout(PHASE_TIMELINE_TIMEOUT_MS) });
+      if (res.ok) {
+        statuses = (await res.json()).statuses;
+      }
+    } catch (error) {
+      // Timeline not reachable, every time falls back below
+    }
+
+    return Promise.all(
+      times.map((time, index) =>
+        statuses[index] != null
+          ? (statuses[index] as TrafficLightEnum)
+          : this.getTrafficLightByTime(time, cameraId)
+      )
+    );
+  }
+
   async getTrafficLightByTime(time: number, cameraId?: string) {
     // Try Redis if cameraId provided and time is recent
     if (cameraId && Math.abs(Date.now() - time) < 5000) {
@@ -14,6 +46,18 @@ export default new class TrafficLightService {
       }
     }
 
+    // Phase intervals: the latest interval starting at or before time, if it still covers time
+    if (cameraId) {
+      const interval = await trafficLightModel
+        .findOne({ cameraId, interval_start: { $lte: time } })
+        .sort({ interval_start: -1 })
+        .lean()
+        .exec();
+      if (interval && interval.interval_end != null && time <= interval.interval_end + PHASE_INTERVAL_GRACE_MS) {
+        return interval.traffic_status as TrafficLightEnum;
+      }
+    }
+
     // MongoDB Aggregation (Original Logic)
     const trafficLights = await trafficLightModel
       .aggregate([
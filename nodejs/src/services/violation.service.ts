@@ -185,19 +185,19 @@ export default new (class ViolationService {
 
         if (recentPositions.length < 2) return null;
 
-        const trafficLightStatusList = (
-          await Promise.all(
-            recentPositions.map(async ({ time, x, y }) => {
-              return {
-                trafficStatus: await trafficLightService.getTrafficLightByTime(
-                  time,
-                  camera_id // Pass camera_id for Redis lookup
-                ),
-                overcomeRedLightLine: y < scaledTrackLineY, // Vượt qua đèn đỏ
-              };
-            })
-          )
-        ).filter((item) => item.trafficStatus !== null);
+        // Every position's light status in one timeline lookup
+        const trafficStatuses = await trafficLightService.getTrafficLightsByTimes(
+          recentPositions.map(({ time }) => time),
+          String(camera_id)
+        );
+        const trafficLightStatusList = recentPositions
+          .map(({ y }, index) => {
+            return {
+              trafficStatus: trafficStatuses[index],
+              overcomeRedLightLine: y < scaledTrackLineY, // Vượt qua đèn đỏ
+            };
+          })
+          .filter((item) => item.trafficStatus !== null);
 
         /* ------------------------ Detect red light violation ----------------------- */
         for (let i = 0; i < trafficLightStatusList.length - 1; i++) {
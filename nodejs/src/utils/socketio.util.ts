@@ -192,6 +192,28 @@ export async function handleTrafficLightEvent(this: Socket, data: any) {
 
   console.log("Traffic light detection data", data.traffic_status);
 
+  if (data.event === "transition" || data.event === "heartbeat") {
+    // One document per phase interval: transitions close the previous interval and open
+    // a new one, heartbeats only move the open interval's end forward
+    const { previous_interval_start, previous_interval_end, ...interval } = data;
+    if (data.event === "transition" && previous_interval_start != null) {
+      trafficLightModel.updateOne(
+        { cameraId: data.cameraId, interval_start: previous_interval_start },
+        { interval_end: previous_interval_end }
+      ).catch((err) => {
+        console.log("Traffic light interval close failed", err.message);
+      });
+    }
+    trafficLightModel.findOneAndUpdate(
+      { cameraId: data.cameraId, interval_start: data.interval_start },
+      interval,
+      { upsert: true, new: true }
+    ).catch((err) => {
+      console.log("Traffic light interval update failed", err.message);
+    });
+    return;
+  }
+
   trafficLightModel.create(data).catch((err) => {
     console.log("Traffic light detection creation failed", err.message);
   });
@@ -284,6 +306,7 @@ export async function handleCarDetectedEvent(this: Socket, data: any) {
         violations,
         buffer: cameraImageBuffer, // Send the high-quality buffer from Redis
         detections: data.detections,
+        created_at: data.created_at, // Evidence frame timestamp, it leaves Redis 60s later
       });
     }
 
@@ -34,8 +34,12 @@ import io
 from PIL import Image
 import queue
 import os
-from flask import Flask, request, jsonify
+import json
+import zipfile
+import tempfile
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Configuration ---
 VEHICLE_MODEL_PATH = 'mhiot-vehicle-best-new.pt'
@@ -57,6 +61,36 @@ ENABLE_COUNTING_LINE = True
 COUNTING_LINE_POSITION = 0.5
 BIDIRECTIONAL_COUNTING = True
 
+# Concurrent model execution: the vehicle, traffic light and plate detector -> OCR branches
+# of a frame run at the same time (CUDA streams on GPU, split CPU threads otherwise)
+ENABLE_CONCURRENT_MODELS = True
+MODEL_WORKERS = 3  # One per branch
+
+TRACK_LINE_BAND = 0.1  # Default half-height of the 'track_line' region
+
+# Cascade policy per model branch, applied per camera:
+#   'every': run on every Nth frame only, reusing the last result in between
+#   'after' + 'classes' + 'region': run only if the upstream branch found one of classes
+#       with its box center in region, (x1, y1, x2, y2) relative to the frame or
+#       'track_line' for a band of 'band' (default TRACK_LINE_BAND, relative to the frame
+#       height) either side of the camera's track line
+#   'on_crops': run on the crops of those upstream detections instead of the full frame
+# Branches without 'after' run first (concurrently), cascaded ones once their upstream is done.
+MODEL_POLICIES = {
+    'vehicle': {'every': 1},
+    'traffic_light': {'every': 5},
+    'license_plate': {'after': 'vehicle', 'classes': VEHICLE_CLASSES, 'region': 'track_line', 'band': TRACK_LINE_BAND,
+                      'on_crops': True},
+}
+DEFAULT_TRACK_LINE_Y = 50  # Percentage of the image height, same default as the camera model
+
+# /api/detect/batch and /api/detect/video: decoding runs PREFETCH_SIZE items ahead on a
+# background thread, results stream back as NDJSON, one line per image or frame
+PREFETCH_SIZE = 16
+MAX_REQUEST_BATCH = 8  # Most images or frames run through each model at once
+VIDEO_FRAME_STRIDE = 5  # Process every Nth video frame unless ?stride= says otherwise
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
 # Global variables
 running = True
 connected = False
@@ -66,6 +100,10 @@ lp_detector_model = None
 lp_ocr_model = None
 sio = None
 ngrok_url = None
+model_executor = None
+model_locks = {}  # id(model) -> lock, a YOLO model must not run in two threads at once
+cascade_stats = {}  # branch -> {'ran', 'reused', 'gated'} counts
+stats_lock = threading.Lock()  # Flask request threads update cascade_stats concurrently
 
 # Dictionary to manage queues and threads for each camera
 camera_queues = {}
@@ -90,7 +128,8 @@ def health_check():
             'lp_ocr': lp_ocr_model is not None
         },
         'ngrok_url': ngrok_url,
-        'socket_connected': connected
+        'socket_connected': connected,
+        'cascade': cascade_snapshot()
     })
 
 
@@ -119,8 +158,6 @@ def api_detect():
     Content-Type: application/json
     Body: {"image": "base64_encoded_image"}
     """
-    global vehicle_model, traffic_light_model, lp_detector_model, lp_ocr_model
-    
     try:
         # Get image from request
         if 'image' in request.files:
@@ -136,99 +173,12 @@ def api_detect():
         else:
             return jsonify({'error': 'No image provided'}), 400
         
-        # Convert to PIL Image then to OpenCV format
-        img = Image.open(io.BytesIO(image_bytes))
-        frame = np.array(img)
-        if len(frame.shape) == 2:  # Grayscale
-            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
-        elif frame.shape[2] == 4:  # RGBA
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
-        else:
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        frame = decode_image(image_bytes)
         
         height, width = frame.shape[:2]
         start_time = time.time()
         
-        all_detections = []
-        
-        # Vehicle Detection
-        if vehicle_model is not None:
-            results = vehicle_model(frame, verbose=False)
-            for result in results:
-                for box in result.boxes:
-                    confidence = float(box.conf[0])
-                    if confidence >= CONFIDENCE_THRESHOLD:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        cls_id = int(box.cls[0])
-                        all_detections.append({
-                            'type': 'vehicle',
-                            'class': vehicle_model.names[cls_id],
-                            'confidence': confidence,
-                            'bbox': {
-                                'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
-                                'x1_rel': x1/width, 'y1_rel': y1/height,
-                                'x2_rel': x2/width, 'y2_rel': y2/height
-                            }
-                        })
-        
-        # Traffic Light Detection
-        if traffic_light_model is not None:
-            results = traffic_light_model(frame, verbose=False)
-            for result in results:
-                for box in result.boxes:
-                    confidence = float(box.conf[0])
-                    if confidence >= CONFIDENCE_THRESHOLD:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        cls_id = int(box.cls[0])
-                        all_detections.append({
-                            'type': 'traffic_light',
-                            'class': traffic_light_model.names[cls_id],
-                            'confidence': confidence,
-                            'bbox': {
-                                'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
-                                'x1_rel': x1/width, 'y1_rel': y1/height,
-                                'x2_rel': x2/width, 'y2_rel': y2/height
-                            }
-                        })
-        
-        # License Plate Detection + OCR
-        if lp_detector_model is not None:
-            results = lp_detector_model(frame, verbose=False)
-            for result in results:
-                for box in result.boxes:
-                    confidence = float(box.conf[0])
-                    if confidence >= 0.3:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        lp_text = None
-                        
-                        # OCR
-                        if lp_ocr_model is not None:
-                            try:
-                                lp_crop = frame[y1:y2, x1:x2]
-                                if lp_crop.size > 0:
-                                    ocr_results = lp_ocr_model(lp_crop, verbose=False)
-                                    chars = []
-                                    for ocr_result in ocr_results:
-                                        for ocr_box in ocr_result.boxes:
-                                            char_cls = int(ocr_box.cls[0])
-                                            char_x = float(ocr_box.xyxy[0][0])
-                                            chars.append((char_x, lp_ocr_model.names[char_cls]))
-                                    chars.sort(key=lambda x: x[0])
-                                    lp_text = ''.join([c[1] for c in chars])
-                            except:
-                                pass
-                        
-                        all_detections.append({
-                            'type': 'license_plate',
-                            'class': 'license_plate',
-                            'text': lp_text,
-                            'confidence': confidence,
-                            'bbox': {
-                                'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
-                                'x1_rel': x1/width, 'y1_rel': y1/height,
-                                'x2_rel': x2/width, 'y2_rel': y2/height
-                            }
-                        })
+        all_detections = detect_api_batch([frame])[0]
         
         inference_time = (time.time() - start_time) * 1000
         
@@ -244,6 +194,108 @@ def api_detect():
         return jsonify({'error': str(e)}), 500
 
 
+@flask_app.route('/api/detect/batch', methods=['POST'])
+def api_detect_batch():
+    """
+    Detect objects in many images, streaming one NDJSON line per image as it finishes
+    
+    POST /api/detect/batch
+    Content-Type: multipart/form-data
+    Body: any number of image files and/or zip archives of images
+    
+    Lines: {"index", "name", "detections", "count", "image_size"} or {"index", "name", "error"},
+    then {"status": "done", "items", "elapsed_ms"}
+    """
+    files = [file for key in request.files for file in request.files.getlist(key)]
+    if not files:
+        return jsonify({'error': 'No images provided'}), 400
+    
+    def items():
+        for file in files:
+            if file.filename.lower().endswith('.zip') or file.mimetype in ('application/zip', 'application/x-zip-compressed'):
+                with zipfile.ZipFile(file.stream) as archive:
+                    for name in sorted(archive.namelist()):
+                        if name.lower().endswith(IMAGE_EXTENSIONS):
+                            yield decoded(name, lambda: decode_image(archive.read(name)))
+            else:
+                yield decoded(file.filename, lambda: decode_image(file.read()))
+    
+    return Response(stream_with_context(stream_detections(items())), mimetype='application/x-ndjson')
+
+
+@flask_app.route('/api/detect/video', methods=['POST'])
+def api_detect_video():
+    """
+    Detect objects in every Nth frame of a video, streaming one NDJSON line per frame
+    
+    POST /api/detect/video?stride=5
+    Content-Type: multipart/form-data
+    Body: video file (MP4 or anything OpenCV can read)
+    
+    Lines: {"index", "frame", "timestamp_ms", "detections", "count", "image_size"},
+    then {"status": "done", "items", "elapsed_ms"}
+    """
+    if 'video' not in request.files:
+        return jsonify({'error': 'No video provided'}), 400
+    try:
+        stride = max(1, int(request.args.get('stride', VIDEO_FRAME_STRIDE)))
+    except ValueError:
+        return jsonify({'error': 'stride must be an integer'}), 400
+    
+    # OpenCV reads videos from a path
+    suffix = os.path.splitext(request.files['video'].filename or '')[1] or '.mp4'
+    video_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        request.files['video'].save(video_file)
+        video_file.close()
+    except Exception:
+        video_file.close()
+        os.remove(video_file.name)
+        raise
+    capture = cv2.VideoCapture(video_file.name)
+    video_lock = threading.Lock()  # The prefetch thread reads the capture while the response may close it
+    released = [False]
+    
+    def release_video():
+        with video_lock:
+            if released[0]:
+                return
+            released[0] = True
+            capture.release()
+            try:
+                os.remove(video_file.name)
+            except FileNotFoundError:
+                pass
+    
+    if not capture.isOpened():
+        release_video()
+        return jsonify({'error': 'Could not open video'}), 400
+    
+    def items():
+        frame_number = 0
+        try:
+            while True:
+                item = None
+                with video_lock:
+                    # grab() only demuxes; frames between strides are never decoded
+                    if released[0] or not capture.grab():
+                        break
+                    if frame_number % stride == 0:
+                        ok, frame = capture.retrieve()
+                        if ok:
+                            item = {'frame': frame_number, 'timestamp_ms': capture.get(cv2.CAP_PROP_POS_MSEC)}, frame
+                frame_number += 1
+                if item is not None:
+                    yield item
+        finally:
+            release_video()
+    
+    response = Response(stream_with_context(stream_detections(items())), mimetype='application/x-ndjson')
+    # Also runs when the client leaves before the stream (and so items()) ever started
+    response.call_on_close(release_video)
+    return response
+
+
 def run_flask_server(port=5000):
     """Run Flask server in background thread"""
     flask_app.run(host='0.0.0.0', port=port, threaded=True, use_reloader=False)
@@ -270,7 +322,7 @@ def setup_ngrok(port=5000, authtoken=None):
 
 def load_models():
     """Load all YOLO models"""
-    global vehicle_model, traffic_light_model, lp_detector_model, lp_ocr_model
+    global vehicle_model, traffic_light_model, lp_detector_model, lp_ocr_model, model_executor
     
     # Check GPU availability
     device = 'cpu'
@@ -333,9 +385,465 @@ def load_models():
     except Exception as e:
         print(f"❌ Failed to load LP OCR model: {e}")
     
+    if ENABLE_CONCURRENT_MODELS:
+        model_executor = ModelExecutor(device, MODEL_WORKERS)
+        print(f"⚡ Running model branches concurrently on {device} ({MODEL_WORKERS} workers)")
+    
     return vehicle_model is not None
 
 
+class ModelExecutor:
+    """
+    Runs independent model branches of a frame concurrently
+
+    On GPU every worker thread launches its kernels on its own CUDA stream so branches
+    overlap on the device; on CPU the intra-op threads are split between the workers so
+    concurrent branches don't oversubscribe the cores.
+    """
+
+    def __init__(self, device, workers):
+        self.device = device
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='model')
+        self.local = threading.local()
+        if device == 'cpu':
+            try:
+                import torch
+                torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+            except ImportError:
+                pass
+
+    def _run(self, fn):
+        if self.device != 'cuda':
+            return fn()
+        import torch
+        stream = getattr(self.local, 'stream', None)
+        if stream is None:
+            stream = self.local.stream = torch.cuda.Stream()
+        with torch.cuda.stream(stream):
+            result = fn()
+        stream.synchronize()
+        return result
+
+    def run(self, branches):
+        """Run {name: callable} concurrently, returns {name: result}"""
+        futures = {name: self.pool.submit(self._run, fn) for name, fn in branches.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def run_branches(branches):
+    """Run {name: callable} on the model executor, or one after another if it is disabled"""
+    if model_executor is None:
+        return {name: fn() for name, fn in branches.items()}
+    return model_executor.run(branches)
+
+
+def run_model(model, *args, track=False, **kwargs):
+    """Call a model (or its tracker) while holding its lock"""
+    with model_locks.setdefault(id(model), threading.Lock()):
+        return model.track(*args, **kwargs) if track else model(*args, **kwargs)
+
+
+def read_plate_text(ocr_result, names):
+    """Join OCR character boxes left to right"""
+    chars = []
+    for ocr_box in ocr_result.boxes:
+        char_cls = int(ocr_box.cls[0])
+        char_x = float(ocr_box.xyxy[0][0])
+        chars.append((char_x, names[char_cls]))
+    # Sort by x position and join
+    chars.sort(key=lambda x: x[0])
+    return ''.join([c[1] for c in chars])
+
+
+def detect_boxes(model, frame, threshold, regions=None):
+    """
+    Run a model on the full frame, or in one batch on the crops of regions
+    Returns:
+        (x1, y1, x2, y2, confidence, cls_id) per box, in pixels of the full frame
+    """
+    height, width = frame.shape[:2]
+    if regions is None:
+        images, offsets = frame, [(0, 0)]
+    else:
+        images, offsets = [], []
+        for region in regions:
+            bbox = region['bbox']
+            x1, y1 = max(0, int(bbox['x1'] * width)), max(0, int(bbox['y1'] * height))
+            x2, y2 = min(width, int(bbox['x2'] * width)), min(height, int(bbox['y2'] * height))
+            if x2 > x1 and y2 > y1:
+                images.append(frame[y1:y2, x1:x2])
+                offsets.append((x1, y1))
+        if not images:
+            return []
+    
+    boxes = []
+    for (offset_x, offset_y), result in zip(offsets, run_model(model, images, verbose=False)):
+        boxes.extend(result_boxes(result, threshold, offset_x, offset_y))
+    return boxes
+
+
+def result_boxes(result, threshold, offset_x=0, offset_y=0):
+    """(x1, y1, x2, y2, confidence, cls_id) of one result's boxes above threshold, shifted by the offset"""
+    boxes = []
+    for box in result.boxes:
+        confidence = float(box.conf[0])
+        if confidence >= threshold:
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            boxes.append((x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y, confidence, int(box.cls[0])))
+    return boxes
+
+
+def detect_vehicles(frame, regions=None):
+    """Vehicle branch (root of the cascade, always on the full frame so tracking stays consistent)"""
+    height, width = frame.shape[:2]
+    vehicle_results = (run_model(vehicle_model, frame, track=True, persist=True, verbose=False)
+                       if ENABLE_TRACKING else run_model(vehicle_model, frame, verbose=False))
+    vehicle_detections = []
+    for result in vehicle_results:
+        boxes = result.boxes
+        for box in boxes:
+            confidence = float(box.conf[0])
+            cls_id = int(box.cls[0])
+            
+            if confidence >= CONFIDENCE_THRESHOLD:
+                x1, y1, x2, y2 = map(int, box.xyxy[0])
+                
+                track_id = None
+                if ENABLE_TRACKING and hasattr(box, 'id') and box.id is not None:
+                    try:
+                        track_id = int(box.id[0])
+                    except:
+                        track_id = None
+                
+                detection_info = {
+                    'class': vehicle_model.names[cls_id],
+                    'type': 'vehicle',
+                    'confidence': float(confidence),
+                    'bbox': {
+                        'x1': float(x1 / width),
+                        'y1': float(y1 / height),
+                        'x2': float(x2 / width),
+                        'y2': float(y2 / height),
+                    }
+                }
+                if track_id is not None:
+                    detection_info['id'] = track_id
+                vehicle_detections.append(detection_info)
+    return vehicle_detections
+
+
+def detect_traffic_lights(frame, regions=None):
+    """Traffic light branch: detections with boxes relative to the frame"""
+    height, width = frame.shape[:2]
+    traffic_light_detections = []
+    for x1, y1, x2, y2, confidence, cls_id in detect_boxes(traffic_light_model, frame, CONFIDENCE_THRESHOLD, regions):
+        traffic_light_detections.append({
+            'class': traffic_light_model.names[cls_id],
+            'type': 'traffic_light',
+            'confidence': float(confidence),
+            'bbox': {
+                'x1': float(x1 / width),
+                'y1': float(y1 / height),
+                'x2': float(x2 / width),
+                'y2': float(y2 / height),
+            }
+        })
+    return traffic_light_detections
+
+
+def detect_license_plates(frame, regions=None):
+    """Plate branch: the plate detector, then OCR chained on all of its crops in one call"""
+    height, width = frame.shape[:2]
+    license_plate_detections = []
+    crops = []
+    # Lower threshold for LP detection
+    for x1, y1, x2, y2, confidence, cls_id in detect_boxes(lp_detector_model, frame, 0.3, regions):
+        license_plate_detections.append({
+            'type': 'license_plate',
+            'confidence': float(confidence),
+            'bbox': {
+                'x1': float(x1 / width),
+                'y1': float(y1 / height),
+                'x2': float(x2 / width),
+                'y2': float(y2 / height),
+            },
+            'text': None
+        })
+        crops.append(frame[max(0, y1):y2, max(0, x1):x2])
+
+    # Run OCR on cropped license plates
+    readable = [index for index, crop in enumerate(crops) if crop.size > 0]
+    if lp_ocr_model is not None and readable:
+        try:
+            ocr_results = run_model(lp_ocr_model, [crops[index] for index in readable], verbose=False)
+            for index, ocr_result in zip(readable, ocr_results):
+                license_plate_detections[index]['text'] = read_plate_text(ocr_result, lp_ocr_model.names)
+        except Exception as e:
+            pass
+    return license_plate_detections
+
+
+# Branch name -> (function(frame, regions), model it needs)
+MODEL_BRANCHES = {
+    'vehicle': (detect_vehicles, lambda: vehicle_model),
+    'traffic_light': (detect_traffic_lights, lambda: traffic_light_model),
+    'license_plate': (detect_license_plates, lambda: lp_detector_model),
+}
+
+
+def policy_regions(policy, upstream_detections, track_line_y):
+    """Upstream detections of the policy's classes whose box center lies in its region"""
+    region = policy.get('region')
+    if region == 'track_line':
+        if track_line_y is None:
+            region = None  # No track line to gate on, keep every upstream detection of the classes
+        else:
+            line = track_line_y / 100.0  # Percentage of the image height, as sent by the Node server
+            band = policy.get('band', TRACK_LINE_BAND)
+            region = (0.0, line - band, 1.0, line + band)
+    classes = policy.get('classes')
+    selected = []
+    for detection in upstream_detections:
+        if classes is not None and detection.get('class') not in classes:
+            continue
+        bbox = detection['bbox']
+        center_x, center_y = (bbox['x1'] + bbox['x2']) / 2, (bbox['y1'] + bbox['y2']) / 2
+        if region is not None and not (region[0] <= center_x <= region[2] and region[1] <= center_y <= region[3]):
+            continue
+        selected.append(detection)
+    return selected
+
+
+def count_cascade(name, outcome):
+    """Count one 'ran', 'reused' or 'gated' outcome of a branch"""
+    with stats_lock:
+        stats = cascade_stats.setdefault(name, {'ran': 0, 'reused': 0, 'gated': 0})
+        stats[outcome] += 1
+
+
+def cascade_snapshot():
+    """Copy of cascade_stats that is safe to serialize while requests update it"""
+    with stats_lock:
+        return {name: dict(stats) for name, stats in cascade_stats.items()}
+
+
+def run_cascade(frame, frame_index, last_results, track_line_y):
+    """
+    Run the loaded branches of a frame under MODEL_POLICIES
+    Args:
+        frame_index: Per-camera frame counter, for 'every'
+        last_results: Per-camera branch -> last result, updated in place
+        track_line_y: The camera's track line (percentage of the image height), for the 'track_line' region
+    Returns:
+        Branch name -> detections
+    """
+    results = {}
+    pending = [name for name, (_, model) in MODEL_BRANCHES.items() if model() is not None]
+    while pending:
+        # This stage: every branch whose upstream is not still waiting
+        stage = [name for name in pending if MODEL_POLICIES.get(name, {}).get('after') not in pending]
+        if not stage:
+            raise ValueError(f"Cyclic MODEL_POLICIES among {pending}")
+        pending = [name for name in pending if name not in stage]
+        branches = {}
+        for name in stage:
+            policy = MODEL_POLICIES.get(name, {})
+            upstream = policy.get('after')
+            
+            # The upstream gate comes first, so a reused result never outlives its upstream condition
+            regions = None
+            if upstream is not None:
+                regions = policy_regions(policy, results.get(upstream, []), track_line_y)
+                if not regions:
+                    results[name] = last_results[name] = []
+                    count_cascade(name, 'gated')
+                    continue
+                if not policy.get('on_crops'):
+                    regions = None
+            if frame_index % policy.get('every', 1) != 0 and name in last_results:
+                results[name] = last_results[name]
+                count_cascade(name, 'reused')
+                continue
+            count_cascade(name, 'ran')
+            branches[name] = (lambda fn, regions: lambda: fn(frame, regions))(MODEL_BRANCHES[name][0], regions)
+        
+        ran = run_branches(branches)
+        results.update(ran)
+        last_results.update(ran)
+    return results
+
+
+def decode_image(image_bytes):
+    """Encoded image bytes to a BGR frame"""
+    # Convert to PIL Image then to OpenCV format
+    img = Image.open(io.BytesIO(image_bytes))
+    frame = np.array(img)
+    if len(frame.shape) == 2:  # Grayscale
+        frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    elif frame.shape[2] == 4:  # RGBA
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
+    else:
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    return frame
+
+
+def decoded(name, decode):
+    """(info, frame) for a stream item, or (info, exception) if it can't be decoded"""
+    try:
+        return {'name': name}, decode()
+    except Exception as e:
+        return {'name': name}, e
+
+
+def prefetch_batches(items, max_batch, size=PREFETCH_SIZE):
+    """
+    Pull items on a background thread, up to size ahead, and yield them in batches
+    Each batch has whatever is ready (at least one item, at most max_batch), so the
+    model never waits for decoding and a batch never waits to fill up.
+    """
+    prefetched = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    done = object()
+    
+    def offer(item):
+        while not stop.is_set():
+            try:
+                prefetched.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def worker():
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                offer(item)
+        except Exception as e:
+            offer(e)
+        finally:
+            if hasattr(items, 'close'):
+                items.close()  # Run the source's cleanup even if the stream was abandoned
+            offer(done)
+    
+    threading.Thread(target=worker, daemon=True).start()
+    try:
+        finished = False
+        while not finished:
+            batch = [prefetched.get()]
+            while len(batch) < max_batch:
+                try:
+                    batch.append(prefetched.get_nowait())
+                except queue.Empty:
+                    break
+            if any(item is done for item in batch):
+                finished = True
+                batch = [item for item in batch if item is not done]
+            for item in batch:
+                if isinstance(item, Exception):
+                    raise item
+            if batch:
+                yield batch
+    finally:
+        stop.set()  # Client went away or the stream ended, let the worker exit
+
+
+def stream_detections(items):
+    """NDJSON lines for (info, frame) items, detected in prefetched batches"""
+    start_time = time.time()
+    index = 0
+    try:
+        for batch in prefetch_batches(items, MAX_REQUEST_BATCH):
+            frames = [frame for _, frame in batch if not isinstance(frame, Exception)]
+            batch_detections = iter(detect_api_batch(frames) if frames else [])
+            for info, frame in batch:
+                line = {'index': index, **info}
+                if isinstance(frame, Exception):
+                    line['error'] = str(frame)
+                else:
+                    detections = next(batch_detections)
+                    height, width = frame.shape[:2]
+                    line.update({'detections': detections, 'count': len(detections),
+                                 'image_size': {'width': width, 'height': height}})
+                index += 1
+                yield json.dumps(line) + '\n'
+    except Exception as e:
+        # Headers are already sent, so a failure (e.g. a corrupt archive) ends the stream with an error line
+        yield json.dumps({'status': 'error', 'error': str(e), 'items': index}) + '\n'
+        return
+    yield json.dumps({'status': 'done', 'items': index, 'elapsed_ms': (time.time() - start_time) * 1000}) + '\n'
+
+
+def api_detection(detection_type, class_name, confidence, box, width, height):
+    """One /api/detect detection, with pixel and relative coordinates"""
+    x1, y1, x2, y2 = box
+    return {
+        'type': detection_type,
+        'class': class_name,
+        'confidence': confidence,
+        'bbox': {
+            'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
+            'x1_rel': x1/width, 'y1_rel': y1/height,
+            'x2_rel': x2/width, 'y2_rel': y2/height
+        }
+    }
+
+
+def detect_api_batch(frames):
+    """
+    /api/detect detections for several frames, running each model once on all of them
+    Returns:
+        One list of detections (vehicles, traffic lights, then plates) per frame
+    """
+    def detect(model, threshold):
+        return [result_boxes(result, threshold) for result in run_model(model, frames, verbose=False)]
+
+    def detect_plates():
+        plate_boxes = detect(lp_detector_model, 0.3)
+        texts = [[None] * len(boxes) for boxes in plate_boxes]
+        # OCR chained on every plate crop of every frame, in one call
+        crops, owners = [], []
+        for frame_index, (frame, boxes) in enumerate(zip(frames, plate_boxes)):
+            for plate_index, (x1, y1, x2, y2, _, _) in enumerate(boxes):
+                crop = frame[max(0, y1):y2, max(0, x1):x2]
+                if crop.size > 0:
+                    crops.append(crop)
+                    owners.append((frame_index, plate_index))
+        if lp_ocr_model is not None and crops:
+            try:
+                for (frame_index, plate_index), ocr_result in zip(owners, run_model(lp_ocr_model, crops, verbose=False)):
+                    texts[frame_index][plate_index] = read_plate_text(ocr_result, lp_ocr_model.names)
+            except:
+                pass
+        return plate_boxes, texts
+
+    branches = {}
+    if vehicle_model is not None:
+        branches['vehicle'] = lambda: detect(vehicle_model, CONFIDENCE_THRESHOLD)
+    if traffic_light_model is not None:
+        branches['traffic_light'] = lambda: detect(traffic_light_model, CONFIDENCE_THRESHOLD)
+    if lp_detector_model is not None:
+        branches['license_plate'] = detect_plates
+    results = run_branches(branches)
+
+    batch_detections = []
+    for frame_index, frame in enumerate(frames):
+        height, width = frame.shape[:2]
+        all_detections = []
+        for detection_type, model in (('vehicle', vehicle_model), ('traffic_light', traffic_light_model)):
+            for x1, y1, x2, y2, confidence, cls_id in results.get(detection_type, [[]] * len(frames))[frame_index]:
+                all_detections.append(api_detection(detection_type, model.names[cls_id], confidence,
+                                                    (x1, y1, x2, y2), width, height))
+        if 'license_plate' in results:
+            plate_boxes, texts = results['license_plate']
+            for (x1, y1, x2, y2, confidence, _), text in zip(plate_boxes[frame_index], texts[frame_index]):
+                detection = api_detection('license_plate', 'license_plate', confidence, (x1, y1, x2, y2), width, height)
+                detection['text'] = text
+                all_detections.append(detection)
+        batch_detections.append(all_detections)
+    return batch_detections
+
+
 def check_line_crossing(prev_pos, curr_pos, line_y):
     """Check if a vehicle has crossed the counting line between two positions"""
     prev_y = prev_pos[1]
@@ -362,6 +870,8 @@ def process_frames_thread(camera_id):
     counting_line_y = None
     counting_line_start_x = None
     counting_line_end_x = None
+    frame_index = -1
+    last_results = {}  # Branch -> last result, reused on frames a policy skips
     
     print(f"🎥 Starting frame processing thread for camera {camera_id}")
     
@@ -392,124 +902,32 @@ def process_frames_thread(camera_id):
                 counting_line_end_x = width
                 print(f"📏 [Camera {camera_id}] Counting line initialized at y={counting_line_y}")
             
-            # ========== Run Vehicle Detection ==========
-            vehicle_results = vehicle_model.track(frame, persist=True, verbose=False) if ENABLE_TRACKING else vehicle_model(frame, verbose=False)
-            vehicle_detections = []
+            # ========== Run Models ==========
+            # Independent branches run concurrently, cascaded ones only where their upstream found something
+            frame_index += 1
+            branch_results = run_cascade(frame, frame_index, last_results, track_line_y)
+            
+            # ========== Vehicle Detection ==========
+            vehicle_detections = branch_results.get('vehicle', [])
             current_tracks = {}
             vehicle_counts = {vehicle_type: 0 for vehicle_type in VEHICLE_CLASSES}
             
-            for result in vehicle_results:
-                boxes = result.boxes
-                for box in boxes:
-                    confidence = float(box.conf[0])
-                    cls_id = int(box.cls[0])
-                    
-                    if confidence >= CONFIDENCE_THRESHOLD:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        center_x = (x1 + x2) // 2
-                        center_y = (y1 + y2) // 2
-                        
-                        track_id = None
-                        if ENABLE_TRACKING and hasattr(box, 'id') and box.id is not None:
-                            try:
-                                track_id = int(box.id[0])
-                            except:
-                                track_id = None
-                        
-                        class_name = vehicle_model.names[cls_id]
-                        
-                        detection_info = {
-                            'class': class_name,
-                            'type': 'vehicle',
-                            'confidence': float(confidence),
-                            'bbox': {
-                                'x1': float(x1 / width),
-                                'y1': float(y1 / height),
-                                'x2': float(x2 / width),
-                                'y2': float(y2 / height),
-                            }
-                        }
-                        
-                        if track_id is not None:
-                            detection_info['id'] = track_id
-                            current_tracks[track_id] = {
-                                'position': (center_x, center_y),
-                                'time': created_at,
-                                'class': class_name
-                            }
-                        
-                        vehicle_detections.append(detection_info)
-                        if class_name in vehicle_counts:
-                            vehicle_counts[class_name] += 1
-            
-            # ========== Run Traffic Light Detection ==========
-            traffic_light_detections = []
-            if traffic_light_model is not None:
-                tl_results = traffic_light_model(frame, verbose=False)
-                for result in tl_results:
-                    for box in result.boxes:
-                        confidence = float(box.conf[0])
-                        cls_id = int(box.cls[0])
-                        
-                        if confidence >= CONFIDENCE_THRESHOLD:
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            class_name = traffic_light_model.names[cls_id]
-                            
-                            traffic_light_detections.append({
-                                'class': class_name,
-                                'type': 'traffic_light',
-                                'confidence': float(confidence),
-                                'bbox': {
-                                    'x1': float(x1 / width),
-                                    'y1': float(y1 / height),
-                                    'x2': float(x2 / width),
-                                    'y2': float(y2 / height),
-                                }
-                            })
+            for detection_info in vehicle_detections:
+                class_name = detection_info['class']
+                if 'id' in detection_info:
+                    bbox = detection_info['bbox']
+                    center_x = int((bbox['x1'] + bbox['x2']) * width) // 2
+                    center_y = int((bbox['y1'] + bbox['y2']) * height) // 2
+                    current_tracks[detection_info['id']] = {
+                        'position': (center_x, center_y),
+                        'time': created_at,
+                        'class': class_name
+                    }
+                if class_name in vehicle_counts:
+                    vehicle_counts[class_name] += 1
             
-            # ========== Run License Plate Detection + OCR ==========
-            license_plate_detections = []
-            if lp_detector_model is not None:
-                lp_results = lp_detector_model(frame, verbose=False)
-                for result in lp_results:
-                    for box in result.boxes:
-                        confidence = float(box.conf[0])
-                        
-                        if confidence >= 0.3:  # Lower threshold for LP detection
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            
-                            lp_info = {
-                                'type': 'license_plate',
-                                'confidence': float(confidence),
-                                'bbox': {
-                                    'x1': float(x1 / width),
-                                    'y1': float(y1 / height),
-                                    'x2': float(x2 / width),
-                                    'y2': float(y2 / height),
-                                },
-                                'text': None
-                            }
-                            
-                            # Run OCR on cropped license plate
-                            if lp_ocr_model is not None:
-                                try:
-                                    lp_crop = frame[y1:y2, x1:x2]
-                                    if lp_crop.size > 0:
-                                        ocr_results = lp_ocr_model(lp_crop, verbose=False)
-                                        # Extract text from OCR results
-                                        chars = []
-                                        for ocr_result in ocr_results:
-                                            for ocr_box in ocr_result.boxes:
-                                                char_cls = int(ocr_box.cls[0])
-                                                char_x = float(ocr_box.xyxy[0][0])
-                                                chars.append((char_x, lp_ocr_model.names[char_cls]))
-                                        # Sort by x position and join
-                                        chars.sort(key=lambda x: x[0])
-                                        lp_info['text'] = ''.join([c[1] for c in chars])
-                                except Exception as e:
-                                    pass
-                            
-                            license_plate_detections.append(lp_info)
+            traffic_light_detections = branch_results.get('traffic_light', [])
+            license_plate_detections = branch_results.get('license_plate', [])
             
             # ========== Update Vehicle Tracking ==========
             current_time = time.time()
@@ -638,7 +1056,9 @@ def create_socketio_client(server_url):
         cameraId = data['cameraId']
         imageId = data['imageId']
         created_at = data['created_at']
-        track_line_y = data.get('track_line_y', 0.5)
+        track_line_y = data.get('track_line_y')
+        if track_line_y is None:
+            track_line_y = DEFAULT_TRACK_LINE_Y
         
         try:
             if isinstance(image, dict) and 'image' in image:
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import queue
+import random
+import threading
+from collections import deque
+import cv2
+
+
+class DebugSink:
+    """
+    Writes sampled debug artifacts (an image plus optional JSON metadata) from a
+    background thread so inference threads never wait on disk
+
+    Artifacts go to <root>/<camera_id>/, and each camera directory is kept under
+    max_bytes_per_camera by deleting its oldest artifacts.
+    """
+
+    def __init__(self, root, sample_rate=1.0, queue_size=64, max_bytes_per_camera=50 * 1024 * 1024,
+                 bundle=True, jpeg_quality=90):
+        self.root = root
+        self.sample_rate = sample_rate
+        self.max_bytes_per_camera = max_bytes_per_camera
+        self.bundle = bundle
+        self.jpeg_quality = jpeg_quality
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.files = dict()  # camera dir -> deque of (path, size), oldest first
+        self.dir_bytes = dict()
+        self.stats = {'submitted': 0, 'sampled_out': 0, 'dropped': 0, 'written': 0, 'rotated': 0, 'errors': 0}
+        self.sequence = 0
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()  # Guards start() and stats, updated from every submitting thread and the writer
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._worker, daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=2):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def submit(self, camera_id, image, metadata=None):
+        """
+        Queue an artifact; never blocks. Returns True if it was queued
+        Args:
+            camera_id: Used as the subdirectory name
+            image: BGR image (copied only when sampled)
+            metadata: JSON-serializable dict written next to the image when bundling
+        """
+        self._count('submitted')
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._count('sampled_out')
+            return False
+        try:
+            self.queue.put_nowait((str(camera_id), image.copy(), metadata, time.time()))
+            return True
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+    def _camera_files(self, directory):
+        """Index an existing camera directory the first time it is written to"""
+        if directory not in self.files:
+            os.makedirs(directory, exist_ok=True)
+            existing = []
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if os.path.isfile(path):
+                    existing.append((os.path.getmtime(path), path, os.path.getsize(path)))
+            existing.sort()
+            self.files[directory] = deque((path, size) for _, path, size in existing)
+            self.dir_bytes[directory] = sum(size for _, _, size in existing)
+        return self.files[directory]
+
+    def _write(self, camera_id, image, metadata, created):
+        directory = os.path.join(self.root, camera_id)
+        files = self._camera_files(directory)
+
+        self.sequence += 1
+        stem = os.path.join(directory, f"{int(created * 1000)}_{self.sequence:06d}")
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("Could not encode debug image")
+        outputs = [(stem + '.jpg', encoded.tobytes())]
+        if self.bundle and metadata is not None:
+            outputs.append((stem + '.json', json.dumps(metadata, default=str).encode('utf-8')))
+
+        for path, content in outputs:
+            with open(path, 'wb') as f:
+                f.write(content)
+            files.append((path, len(content)))
+            self.dir_bytes[directory] += len(content)
+
+        # Rotate: drop the oldest artifacts until the camera directory fits again
+        while self.dir_bytes[directory] > self.max_bytes_per_camera and len(files) > len(outputs):
+            path, size = files.popleft()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.dir_bytes[directory] -= size
+            self._count('rotated')
+
+    def _worker(self):
+        while self.running or not self.queue.empty():
+            try:
+                camera_id, image, metadata, created = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._write(camera_id, image, metadata, created)
+                self._count('written')
+            except Exception as e:
+                self._count('errors')
+                print(f"Error writing debug artifact: {e}")
@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import cv2
+import numpy as np
+
+import license_plate
+from session_recorder import SessionReader, DEFAULT_SESSION_PATH
+from session_replay import summarize_latencies, format_latency_summary
+
+# ---------------------------------------------------------------------------- #
+#                             Export configuration                             #
+# ---------------------------------------------------------------------------- #
+# Run from yolo-server/ like the services (torch.hub loads the local 'yolov5' directory).
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+YOLOV5_DIR = os.path.join(SERVICE_DIR, 'yolov5')
+BACKENDS = ['openvino', 'onnx']
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+EXPORT_TRACE_SIZE = 640  # Exports use dynamic axes, this is only the tracing input size
+CALIBRATION_SIZE = 200  # Images per model used for INT8 calibration
+EVAL_FRACTION = 0.2  # Held out from calibration for the accuracy / latency report
+WARMUP_RUNS = 5
+MATCH_IOU = 0.5  # A quantized plate box matches a PyTorch box above this IoU
+SEED = 0
+
+
+# ---------------------------------------------------------------------------- #
+#                               Calibration data                               #
+# ---------------------------------------------------------------------------- #
+def load_image_dir(directory, limit=None):
+    """Every image under directory (recursively), e.g. the debug sink's per-camera plate crops"""
+    images = []
+    for root, _, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image = cv2.imread(os.path.join(root, name))
+            if image is not None:
+                images.append(image)
+            if limit is not None and len(images) >= limit:
+                return images
+    return images
+
+
+def load_session_vehicle_crops(path, limit=None):
+    """Vehicle crops cut from recorded violation_detect events exactly like the service cuts them"""
+    reader = SessionReader(path)
+    crops = []
+    try:
+        for event, _, data in reader:
+            if event != 'violation_detect' or not data.get('detections'):
+                continue
+            frame = cv2.imdecode(np.frombuffer(data['buffer'], np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                continue
+            for detection in data['detections']:
+                vehicle_crop = license_plate.crop_vehicle(frame, detection)
+                if vehicle_crop is not None:
+                    crops.append(np.ascontiguousarray(vehicle_crop[2]))
+            if limit is not None and len(crops) >= limit:
+                break
+    finally:
+        reader.close()
+    return crops[:limit] if limit is not None else crops
+
+
+def split_images(images, eval_fraction):
+    """Shuffle deterministically and split into (calibration, evaluation)"""
+    images = list(images)
+    random.Random(SEED).shuffle(images)
+    n_eval = max(1, int(len(images) * eval_fraction)) if len(images) > 1 else 0
+    return images[n_eval:], images[:n_eval]
+
+
+def detector_size(image):
+    return license_plate.choose_crop_detect_size(*image.shape[:2])
+
+
+def ocr_size(image):
+    return license_plate.OCR_INPUT_SIZE
+
+
+def to_model_input(image, size):
+    """Preprocess like AutoShape does for the service: letterbox, BGR kept, NCHW float in [0, 1]"""
+    boxed = license_plate.letterbox_crop(image, size)[0]
+    return np.ascontiguousarray(boxed.transpose((2, 0, 1))[None], dtype=np.float32) / 255.0
+
+
+# ---------------------------------------------------------------------------- #
+#                              Export + quantization                           #
+# ---------------------------------------------------------------------------- #
+def export_fp32(weights, backend):
+    """Export a .pt model with yolov5/export.py (dynamic axes) and return the FP32 artifact path"""
+    if YOLOV5_DIR not in sys.path:
+        sys.path.insert(0, YOLOV5_DIR)
+    import export
+
+    export.run(weights=weights, imgsz=(EXPORT_TRACE_SIZE, EXPORT_TRACE_SIZE), device='cpu',
+               include=('onnx',) if backend == 'onnx' else ('openvino',), dynamic=True)
+    stem = os.path.splitext(weights)[0]
+    return f"{stem}.onnx" if backend == 'onnx' else f"{stem}_openvino_model"
+
+
+def quantize_onnx(fp32_path, output_path, samples):
+    """
+    Static INT8 (QDQ) quantization with ONNX Runtime
+    Args:
+        samples: List of (image, size) calibration inputs
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    fp32_model = onnx.load(fp32_path)
+    input_name = fp32_model.graph.input[0].name
+
+    class PlateCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self.samples = iter(samples)
+
+        def get_next(self):
+            sample = next(self.samples, None)
+            return None if sample is None else {input_name: to_model_input(*sample)}
+
+    quantize_static(fp32_path, output_path, PlateCalibrationReader(), quant_format=QuantFormat.QDQ,
+                    per_channel=True, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # DetectMultiBackend reads stride and class names from the model metadata
+    int8_model = onnx.load(output_path)
+    existing = {prop.key for prop in int8_model.metadata_props}
+    for prop in fp32_model.metadata_props:
+        if prop.key not in existing:
+            int8_model.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(int8_model, output_path)
+
+
+def quantize_openvino(fp32_dir, output_dir, samples):
+    """
+    Post-training INT8 quantization of an OpenVINO model with NNCF
+    Args:
+        samples: List of (image, size) calibration inputs
+    """
+    import nncf
+    from openvino.runtime import Core, serialize
+
+    xml_path = next(os.path.join(fp32_dir, name) for name in os.listdir(fp32_dir) if name.endswith('.xml'))
+    ov_model = Core().read_model(xml_path)
+    dataset = nncf.Dataset(samples, lambda sample: to_model_input(*sample))
+    quantized = nncf.quantize(ov_model, dataset, preset=nncf.QuantizationPreset.MIXED, subset_size=len(samples))
+
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.basename(xml_path)
+    serialize(quantized, os.path.join(output_dir, name))
+    # DetectMultiBackend reads stride and class names from <model>.yaml next to the .xml
+    shutil.copy(os.path.splitext(xml_path)[0] + '.yaml', os.path.join(output_dir, os.path.splitext(name)[0] + '.yaml'))
+
+
+def build_int8_model(weights, backend, calibration, size_fn):
+    """Export weights and quantize with calibration images, returns the path license_plate.py loads"""
+    samples = [(image, size_fn(image)) for image in calibration]
+    output_path = license_plate.exported_model_path(weights, backend)
+    print(f"Exporting {os.path.basename(weights)} to {backend}, calibrating INT8 on {len(samples)} images...")
+    fp32_path = export_fp32(weights, backend)
+    if backend == 'onnx':
+        quantize_onnx(fp32_path, output_path, samples)
+    else:
+        quantize_openvino(fp32_path, output_path, samples)
+    print(f"Wrote {output_path}")
+    return output_path
+
+
+# ---------------------------------------------------------------------------- #
+#                           Accuracy vs latency report                         #
+# ---------------------------------------------------------------------------- #
+def timed_outputs(fn, images):
+    """Run fn over every image after a few warmup calls, returns (outputs, latencies in ms)"""
+    for image in images[:WARMUP_RUNS]:
+        fn(image)
+    outputs, latencies = [], []
+    for image in images:
+        start = time.perf_counter()
+        outputs.append(fn(image))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return outputs, latencies
+
+
+def detect_boxes(detector):
+    def run(image):
+        results = detector(image, size=detector_size(image))
+        boxes = license_plate.prediction_to_numpy(results.xyxy[0])
+        return boxes[boxes[:, 4] >= license_plate.CONFIDENCE_THRESHOLD, :4]
+    return run
+
+
+def read_plate(ocr):
+    def run(image):
+        return license_plate.read_plates_batch(ocr, [image])[0][0]
+    return run
+
+
+def compare_detectors(reference, candidate, images):
+    reference_boxes, reference_ms = timed_outputs(detect_boxes(reference), images)
+    candidate_boxes, candidate_ms = timed_outputs(detect_boxes(candidate), images)
+    matched = 0
+    for ref, cand in zip(reference_boxes, candidate_boxes):
+        if len(ref) and len(cand):
+            matched += int((license_plate.box_iou(ref, cand).max(axis=1) >= MATCH_IOU).sum())
+    n_reference = sum(len(boxes) for boxes in reference_boxes)
+    n_candidate = sum(len(boxes) for boxes in candidate_boxes)
+    return {
+        'images': len(images),
+        'accuracy': {
+            'reference_boxes': n_reference,
+            'candidate_boxes': n_candidate,
+            'recall_vs_reference': matched / n_reference if n_reference else 1.0,
+            'precision_vs_reference': matched / n_candidate if n_candidate else 1.0,
+        },
+        'reference_latency': summarize_latencies(reference_ms),
+        'candidate_latency': summarize_latencies(candidate_ms),
+    }
+
+
+def compare_ocr(reference, candidate, images):
+    reference_plates, reference_ms = timed_outputs(read_plate(reference), images)
+    candidate_plates, candidate_ms = timed_outputs(read_plate(candidate), images)
+    read = [(ref, cand) for ref, cand in zip(reference_plates, candidate_plates) if ref != "unknown"]
+    return {
+        'images': len(images),
+        'accuracy': {
+            'reference_read': len(read),
+            'reference_valid': sum(license_plate.is_valid_plate(p) for p in reference_plates),
+            'candidate_valid': sum(license_plate.is_valid_plate(p) for p in candidate_plates),
+            'agreement_vs_reference': sum(ref == cand for ref, cand in read) / len(read) if read else 1.0,
+        },
+        'reference_latency': summarize_latencies(reference_ms),
+        'candidate_latency': summarize_latencies(candidate_ms),
+    }
+
+
+def print_report(backend, report):
+    print("=" * 60)
+    print(f"INT8 {backend} vs PyTorch FP32 (CPU)")
+    for model_name, result in report.items():
+        print(f"{model_name} ({result['images']} held-out images)")
+        for key, value in result['accuracy'].items():
+            print(f"  {key:<24} {value:.3f}" if isinstance(value, float) else f"  {key:<24} {value}")
+        reference, candidate = result['reference_latency'], result['candidate_latency']
+        print(f"  pytorch  {format_latency_summary(reference)}")
+        print(f"  {backend:<8} {format_latency_summary(candidate)}")
+        if candidate['mean'] > 0:
+            print(f"  speedup  {reference['mean'] / candidate['mean']:.2f}x mean")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the plate detector and OCR models to INT8 OpenVINO / ONNX '
+                                                 'and report accuracy and latency against the .pt models')
+    parser.add_argument('--backend', choices=BACKENDS, default='openvino')
+    parser.add_argument('--crops', default=license_plate.DEBUG_CROPS_DIR, help='plate crops for the OCR model')
+    parser.add_argument('--vehicle-images', default=None,
+                        help='vehicle crops for the plate detector (default: cut from --session)')
+    parser.add_argument('--session', default=DEFAULT_SESSION_PATH,
+                        help='recorded session whose violation_detect events provide vehicle crops')
+    parser.add_argument('--calibration-size', type=int, default=CALIBRATION_SIZE)
+    parser.add_argument('--eval-fraction', type=float, default=EVAL_FRACTION)
+    parser.add_argument('--report-only', action='store_true', help='skip exporting, only compare existing models')
+    parser.add_argument('--report', default=None, help='also write the report as JSON to this path')
+    args = parser.parse_args()
+
+    limit = int(args.calibration_size / (1 - args.eval_fraction)) + 1
+    plate_crops = load_image_dir(args.crops, limit)
+    if args.vehicle_images:
+        vehicle_crops = load_image_dir(args.vehicle_images, limit)
+    elif os.path.exists(args.session):
+        vehicle_crops = load_session_vehicle_crops(args.session, limit)
+    else:
+        vehicle_crops = []
+    if len(plate_crops) < 2 or len(vehicle_crops) < 2:
+        print(f"Need at least 2 plate crops and 2 vehicle crops, found {len(plate_crops)} and {len(vehicle_crops)}. "
+              f"Run license_plate.py with SAVE_CROPS and record a session first.")
+        sys.exit(1)
+    ocr_calibration, ocr_eval = split_images(plate_crops, args.eval_fraction)
+    detector_calibration, detector_eval = split_images(vehicle_crops, args.eval_fraction)
+
+    if not args.report_only:
+        build_int8_model(license_plate.DETECTOR_PATH, args.backend, detector_calibration, detector_size)
+        build_int8_model(license_plate.OCR_PATH, args.backend, ocr_calibration, ocr_size)
+
+    for weights in (license_plate.DETECTOR_PATH, license_plate.OCR_PATH):
+        if not os.path.exists(license_plate.exported_model_path(weights, args.backend)):
+            print(f"Missing {license_plate.exported_model_path(weights, args.backend)}, export it first.")
+            sys.exit(1)
+
+    # The exported models target CPU-only hosts, compare there
+    license_plate.ENABLE_GPU = False
+    reference_detector, reference_ocr = license_plate.load_model_replica('pytorch')
+    candidate_detector, candidate_ocr = license_plate.load_model_replica(args.backend)
+    report = {
+        'plate_detector': compare_detectors(reference_detector, candidate_detector, detector_eval),
+        'ocr': compare_ocr(reference_ocr, candidate_ocr, ocr_eval),
+    }
+    print_report(args.backend, report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'backend': args.backend, **report}, f, indent=2)
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,13 @@ import time
 import threading
 import queue
 import re
+import itertools
+import heapq
+import hashlib
+from collections import OrderedDict
+from debug_sink import DebugSink
+from plate_index import PlateIndex, serve as serve_plate_index
+from model_registry import registry as model_registry, load_shared
 
 # ---------------------------------------------------------------------------- #
 #                               GLOBAL CONSTANTS                               #
@@ -18,18 +25,76 @@ import re
 MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
 DETECTOR_PATH = os.path.join(MODEL_DIR, 'LP_detector_nano_61.pt')
 OCR_PATH = os.path.join(MODEL_DIR, 'LP_ocr_nano_62.pt')
+MODEL_BACKEND = "pytorch"  # "pytorch", or "openvino" / "onnx" for the INT8 models built by export_plate_models.py
 CONFIDENCE_THRESHOLD = 0.30  # Model confidence threshold
 
 # Image processing configuration
 INPUT_SIZE = 1920
-SAVE_CROPS = True
+OCR_INPUT_SIZE = 320  # Plate crops are letterboxed to this square size so they can share one OCR batch
+PLATE_DETECT_MODE = "vehicle_crops"  # "vehicle_crops" or "full_frame" (one INPUT_SIZE pass over the whole frame)
+VEHICLE_CROP_MARGIN = 0.1  # Fraction of the vehicle bbox added on each side before detecting plates
+VEHICLE_CROP_SIZES = [320, 480, 640, 960]  # Detector sizes for vehicle crops, smallest one covering the crop wins
+SKEW_CANDIDATE_ANGLES = np.arange(-20.0, 20.5, 1.0)  # Degrees tried by the projection-profile skew estimate
+SKEW_SAMPLE_WIDTH = 128  # Crops are downscaled to this width before estimating skew
+SKEW_MIN_ANGLE = 1.0  # Skew estimates smaller than this (or this close to each other) add no OCR variant
+SAVE_CROPS = True  # Sampled plate crops (with OCR boxes and text) are written by a background debug sink
+DEBUG_CROPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crops')
+DEBUG_SAMPLE_RATE = 0.2  # Fraction of plate crops saved
+DEBUG_QUEUE_SIZE = 64  # Crops waiting for the writer; more are dropped instead of blocking OCR
+DEBUG_MAX_BYTES_PER_CAMERA = 50 * 1024 * 1024  # Oldest crops are deleted past this size
+DEBUG_BUNDLE = True  # Write a JSON file with OCR boxes and decoded text next to each crop
+VIETNAM_PLATE_REGEX = r'^[0-9]{2}[A-Z]{1,2}[0-9]{1,5}$'
+PLATE_GRAMMAR = [(2, 2, 'digit'), (1, 2, 'letter'), (1, 5, 'digit')]  # (min, max, kind) segments of VIETNAM_PLATE_REGEX
+OCR_CANDIDATE_CONFIDENCE = 0.05  # OCR runs multi-label down to this score so alternative classes reach the decoder
+OCR_CANDIDATE_IOU = 0.6  # Boxes overlapping more than this are one character with several candidate classes
+OCR_TOP_K = 3  # Candidate classes kept per character
+CONFUSABLE_PAIRS = [('0', 'D'), ('8', 'B'), ('5', 'S'), ('2', 'Z'), ('6', 'G'), ('4', 'A')]
+CONFUSION_PENALTY = 0.5  # Score factor for a look-alike the model did not propose itself
+CONFUSABLE_CHARS = dict(CONFUSABLE_PAIRS + [(b, a) for a, b in CONFUSABLE_PAIRS])
 USE_HALF_PRECISION = True 
 ENABLE_GPU = True 
 
 # Socket.IO configuration
 SOCKETIO_SERVER_URL = 'wss://localhost:3000' 
-MAX_FPS = 90
-QUEUE_SIZE = 5 
+QUEUE_SIZE = 32  # Pending violation events, see ViolationQueue for what is dropped when full
+
+# Admission and scheduling of violation events
+CAMERA_EVENT_RATE = 5.0  # Violation events per second admitted per camera (token bucket refill rate)
+CAMERA_EVENT_BURST = 10  # Token bucket capacity per camera
+VIOLATION_PRIORITIES = {'RED_LIGHT_VIOLATION': 0, 'LANE_ENCROACHMENT': 1}  # Lower is served first
+DEFAULT_VIOLATION_PRIORITY = 2
+PRIORITY_AGING = 5.0  # Seconds of waiting that lift an event by one priority level
+EVIDENCE_TTL = 60.0  # Node keeps the frames violations point to in Redis for this long
+EVIDENCE_EXPIRY_MARGIN = 5.0  # Events with less evidence time left than this are dropped first
+
+# OCR worker pool: each worker owns a detector + OCR model replica
+OCR_WORKERS = 2
+OCR_THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // OCR_WORKERS)  # torch intra-op threads per worker
+WORKER_STATS_INTERVAL = 30.0  # Seconds between queue / worker utilization reports
+
+# Per-track plate cache: skip OCR for vehicles whose plate was already read confidently
+ENABLE_PLATE_CACHE = True
+PLATE_CACHE_TTL = 30.0  # Seconds a track's reading stays valid after it was last seen
+PLATE_CACHE_MIN_CONFIDENCE = 0.6  # Cached readings below this are re-OCR'd and voted again
+PLATE_CACHE_MAX_SIZE = 2000
+PLATE_CACHE_STATS_INTERVAL = 50  # Print cache stats every N processed events
+
+# Multi-frame consensus: vote tracked plates character by character across events
+ENABLE_PLATE_CONSENSUS = False  # Tracked plates are only reported once the consensus is final
+CONSENSUS_MIN_READINGS = 3  # Readings needed before a consensus can be final
+CONSENSUS_MAX_READINGS = 8  # Most recent readings kept per track
+CONSENSUS_AGREEMENT = 0.7  # Minimum winning vote share at every character position
+CONSENSUS_WINDOW = 30.0  # Seconds a track's readings are kept after its last reading
+
+# Local plate index: emitted plates, searchable by exact / prefix / one-edit queries over HTTP
+ENABLE_PLATE_INDEX = True
+PLATE_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plate_index', 'plates.jsonl')
+PLATE_INDEX_HOST = '127.0.0.1'  # Local only, officers' tools reach it through the Node server
+PLATE_INDEX_PORT = 8765
+
+# Frame cache: repeated violation events for one frame reuse its decode, plate detection and readings
+ENABLE_FRAME_CACHE = True
+FRAME_CACHE_SIZE = 8  # Decoded frames kept (up to 1920 px each)
 
 # Initialize Socket.IO client with reconnection settings
 sio = socketio.Client(
@@ -43,16 +108,24 @@ sio = socketio.Client(
 # Global variables
 running = True
 connected = False
-last_processing_time = 0
-plate_queue = queue.Queue(maxsize=QUEUE_SIZE)
 connection_lock = threading.Lock()
 
 # Cached models (loaded once and reused)
 yolo_LP_detect = None
 yolo_license_plate = None
 
+# Queue and worker metrics
+stats_lock = threading.Lock()
+queue_stats = {'enqueued': 0, 'dropped': 0, 'throttled': 0, 'processed': 0}
+worker_stats = dict()  # worker_id -> {'processed', 'busy', 'started'}
+
 model_frame_queue = queue.Queue(maxsize=10)
 
+plate_index = None  # PlateIndex, opened by start_plate_index()
+
+debug_sink = DebugSink(DEBUG_CROPS_DIR, sample_rate=DEBUG_SAMPLE_RATE, queue_size=DEBUG_QUEUE_SIZE,
+                       max_bytes_per_camera=DEBUG_MAX_BYTES_PER_CAMERA, bundle=DEBUG_BUNDLE)
+
 # --------- UTILITY FUNCTIONS (from utils_rotate.py) ---------
 
 def changeContrast(img):
@@ -70,48 +143,48 @@ def rotate_image(image, angle):
     rotated_image = cv2.warpAffine(image, rotation_matrix, image.shape[1::-1], flags=cv2.INTER_LINEAR)
     return rotated_image
 
-def compute_skew(src_img, center_threshold):
-    if len(src_img.shape) == 3:
-        height, width, _ = src_img.shape
-    elif len(src_img.shape) == 2:
-        height, width = src_img.shape
-    else:
-        print('Unsupported image type')
-    blurred_img = cv2.medianBlur(src_img, 3)
-    edges = cv2.Canny(blurred_img, threshold1=30, threshold2=100, apertureSize=3, L2gradient=True)
-    lines = cv2.HoughLinesP(edges, 1, math.pi/180, 30, minLineLength=width/1.5, maxLineGap=height/3.0)
-    if lines is None:
-        return 1
-
-    min_line_y = 100
-    min_line_position = 0
-    for i in range(len(lines)):
-        for x1, y1, x2, y2 in lines[i]:
-            center_point = [((x1+x2)/2), ((y1+y2)/2)]
-            if center_threshold == 1:
-                if center_point[1] < 7:
-                    continue
-            if center_point[1] < min_line_y:
-                min_line_y = center_point[1]
-                min_line_position = i
-
-    angle = 0.0
-    nlines = lines.size
-    cnt = 0
-    for x1, y1, x2, y2 in lines[min_line_position]:
-        ang = np.arctan2(y2 - y1, x2 - x1)
-        if math.fabs(ang) <= 30: # excluding extreme rotations
-            angle += ang
-            cnt += 1
-    if cnt == 0:
+def estimate_skew(src_img):
+    """
+    Estimate plate skew with a projection profile: the rotation that makes the
+    per-row character pixel counts sharpest lines the text up horizontally
+    Returns:
+        Angle in degrees to pass to rotate_image
+    """
+    gray = cv2.cvtColor(src_img, cv2.COLOR_BGR2GRAY) if len(src_img.shape) == 3 else src_img
+    if gray.shape[1] > SKEW_SAMPLE_WIDTH:
+        scale = SKEW_SAMPLE_WIDTH / gray.shape[1]
+        gray = cv2.resize(gray, (SKEW_SAMPLE_WIDTH, max(1, int(gray.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # Characters are the minority class, flip for light-on-dark plates
+    if np.count_nonzero(binary) > binary.size / 2:
+        binary = cv2.bitwise_not(binary)
+    ys, xs = np.nonzero(binary)
+    if len(xs) < 10:
         return 0.0
-    return (angle / cnt)*180/math.pi
 
-def deskew(src_img, change_cons, center_thres):
-    if change_cons == 1:
-        return rotate_image(src_img, compute_skew(changeContrast(src_img), center_thres))
-    else:
-        return rotate_image(src_img, compute_skew(src_img, center_thres))
+    # Row of every character pixel after rotating by each candidate angle, as rotate_image does
+    angles = np.deg2rad(SKEW_CANDIDATE_ANGLES)
+    rows = ys[:, None] * np.cos(angles) - xs[:, None] * np.sin(angles)
+    rows = np.round(rows - rows.min(axis=0)).astype(np.int64)
+    height = int(rows.max()) + 1
+    profiles = np.bincount((rows + np.arange(len(angles)) * height).ravel(), minlength=len(angles) * height)
+    scores = np.square(profiles.reshape(len(angles), height).astype(np.float64)).sum(axis=1)
+    return float(SKEW_CANDIDATE_ANGLES[int(np.argmax(scores))])
+
+def deskew_variants(src_img):
+    """
+    Rotated versions of a plate crop worth OCR'ing next to the original, one per
+    distinct skew estimate (plain and contrast enhanced); near-zero angles are skipped
+    since they would just repeat the original crop
+    """
+    variants = []
+    angles = []
+    for angle in (estimate_skew(src_img), estimate_skew(changeContrast(src_img))):
+        if abs(angle) < SKEW_MIN_ANGLE or any(abs(angle - seen) < SKEW_MIN_ANGLE for seen in angles):
+            continue
+        angles.append(angle)
+        variants.append(rotate_image(src_img, angle))
+    return variants
 
 # --------- HELPER FUNCTIONS (from helper.py) ---------
 
@@ -120,135 +193,834 @@ def linear_equation(x1, y1, x2, y2):
     a = (y1 - b) / x1
     return a, b
 
-def check_point_linear(x, y, x1, y1, x2, y2):
-    a, b = linear_equation(x1, y1, x2, y2)
-    y_pred = a*x+b
-    return(math.isclose(y_pred, y, abs_tol = 3))
+def prediction_to_numpy(pred):
+    """Move one image's (n, 6) xyxy/conf/cls prediction tensor to a float64 NumPy array"""
+    return pred.detach().float().cpu().numpy().astype(np.float64)
+
+def box_iou(a, b):
+    """IoU matrix between (n, 4) and (m, 4) xyxy boxes"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+def group_char_candidates(boxes, names):
+    """
+    Merge the multi-label OCR boxes of one character into a single box with candidate classes
+    Args:
+        boxes: (n, 6) character boxes [x1, y1, x2, y2, conf, cls], one per (box, class) above the model conf
+        names: OCR model class names
+
+    Returns:
+        (m, 6) boxes with the best class per character, dropping characters whose best score is under
+        CONFIDENCE_THRESHOLD, and per box a list of up to OCR_TOP_K (character, confidence), best first
+    """
+    if len(boxes) == 0:
+        return boxes, []
+    boxes = boxes[np.argsort(-boxes[:, 4], kind="stable")]
+    overlaps = box_iou(boxes[:, :4], boxes[:, :4]) > OCR_CANDIDATE_IOU
+    assigned = np.zeros(len(boxes), dtype=bool)
+    primaries = []
+    candidates = []
+    for i in range(len(boxes)):
+        if assigned[i]:
+            continue
+        if boxes[i, 4] < CONFIDENCE_THRESHOLD:
+            break  # Sorted by score, every remaining character is below the threshold too
+        members = np.flatnonzero(overlaps[i] & ~assigned)
+        assigned[members] = True
+        assigned[i] = True
+        chars = []
+        for j in [i] + [j for j in members if j != i]:
+            char = str(names[int(boxes[j, 5])])
+            if char not in (c for c, _ in chars):
+                chars.append((char, float(boxes[j, 4])))
+        primaries.append(i)
+        candidates.append(chars[:OCR_TOP_K])
+    return boxes[primaries], candidates
+
+def char_fits(char, kind):
+    return char.isdigit() if kind == 'digit' else char.isalpha()
+
+def grammar_decode(candidates):
+    """
+    Highest-scoring reading of a plate that satisfies PLATE_GRAMMAR
+    Args:
+        candidates: Per character position, list of (character, confidence) best first
+
+    Returns:
+        List of (character, confidence), or None when no segmentation of the positions fits
+    """
+    # Best candidate of each kind per position, look-alikes of the model's candidates at a penalty
+    best = []
+    for options in candidates:
+        extended = list(options) + [(CONFUSABLE_CHARS[c], conf * CONFUSION_PENALTY)
+                                    for c, conf in options if c in CONFUSABLE_CHARS]
+        best.append({
+            kind: max((option for option in extended if char_fits(option[0], kind)), key=lambda o: o[1], default=None)
+            for kind in ('digit', 'letter')
+        })
+
+    best_reading, best_score = None, -math.inf
+    ranges = [range(low, high + 1) for low, high, _ in PLATE_GRAMMAR]
+    for lengths in itertools.product(*ranges):
+        if sum(lengths) != len(candidates):
+            continue
+        kinds = [kind for length, (_, _, kind) in zip(lengths, PLATE_GRAMMAR) for _ in range(length)]
+        reading = [position[kind] for position, kind in zip(best, kinds)]
+        if any(option is None for option in reading):
+            continue
+        score = sum(math.log(max(conf, 1e-9)) for _, conf in reading)
+        if score > best_score:
+            best_reading, best_score = reading, score
+    return best_reading
+
+def letterbox_crop(img, size, color=(114, 114, 114)):
+    """
+    Resize an image to fit a size x size square keeping aspect ratio, padding the rest
+    Returns:
+        Letterboxed image, scale ratio and (pad_x, pad_y) to map boxes back
+    """
+    height, width = img.shape[:2]
+    ratio = size / max(height, width)
+    new_width, new_height = max(1, int(round(width * ratio))), max(1, int(round(height * ratio)))
+    resized = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    pad_x = (size - new_width) // 2
+    pad_y = (size - new_height) // 2
+    boxed = cv2.copyMakeBorder(resized, pad_y, size - new_height - pad_y, pad_x, size - new_width - pad_x,
+                               cv2.BORDER_CONSTANT, value=color)
+    return boxed, ratio, (pad_x, pad_y)
+
+# order the characters found in a license plate as they are read
+def plate_reading_order(boxes):
+    """
+    Args:
+        boxes: (n, 6) array of character boxes [x1, y1, x2, y2, conf, cls]
+
+    Returns:
+        Box indices in reading order, None separating the lines of a 2 line plate,
+        or None when the box count can't be a plate
+    """
+    if len(boxes) < 7 or len(boxes) > 10:
+        return None
+    x_c = (boxes[:, 0] + boxes[:, 2]) / 2
+    y_c = (boxes[:, 1] + boxes[:, 3]) / 2
+
+    # find 2 point to draw line, characters off that line mean a 2 line plate
+    l_idx = int(np.argmin(x_c))
+    r_idx = int(np.argmax(x_c))
+    LP_type = "1"
+    if x_c[l_idx] != x_c[r_idx]:
+        a, b = linear_equation(x_c[l_idx], y_c[l_idx], x_c[r_idx], y_c[r_idx])
+        y_pred = a * x_c + b
+        # same test as math.isclose(y_pred, y, abs_tol=3)
+        tolerance = np.maximum(1e-9 * np.maximum(np.abs(y_pred), np.abs(y_c)), 3)
+        if np.any(np.abs(y_pred - y_c) > tolerance):
+            LP_type = "2"
+
+    if LP_type == "2":
+        y_mean = int(int(y_c.sum()) / len(boxes))
+        lower = y_c.astype(np.int64) > y_mean
+        line_1 = np.flatnonzero(~lower)
+        line_2 = np.flatnonzero(lower)
+        line_1 = line_1[np.argsort(x_c[line_1], kind="stable")]
+        line_2 = line_2[np.argsort(x_c[line_2], kind="stable")]
+        return [int(i) for i in line_1] + [None] + [int(i) for i in line_2]
+    return [int(i) for i in np.argsort(x_c, kind="stable")]
+
+def decode_plate_chars(boxes, names, candidates=None):
+    """
+    Args:
+        boxes: (n, 6) array of character boxes [x1, y1, x2, y2, conf, cls]
+        names: OCR model class names
+        candidates: Optional per box (character, confidence) candidates from group_char_candidates;
+            the highest-scoring reading that fits PLATE_GRAMMAR is preferred over the top classes
+
+    Returns:
+        List of (character, confidence) in reading order, "-" separating the lines
+        of a 2 line plate, or None when the box count can't be a plate
+    """
+    order = plate_reading_order(boxes)
+    if order is None:
+        return None
+    chars = [(str(names[int(boxes[i, 5])]), float(boxes[i, 4])) for i in order if i is not None]
+    if candidates is not None:
+        chars = grammar_decode([candidates[i] for i in order if i is not None]) or chars
+    if None in order:
+        chars.insert(order.index(None), ("-", 1.0))
+    return chars
+
+# assemble the characters found in a license plate into a string
+def decode_plate(boxes, names):
+    primary, candidates = group_char_candidates(boxes, names)
+    plate_chars = decode_plate_chars(primary, names, candidates)
+    if plate_chars is None:
+        return "unknown"
+    return "".join(char for char, _ in plate_chars)
 
 # detect character and number in license plate
 def read_plate(yolo_license_plate, im):
-    LP_type = "1"
     results = yolo_license_plate(im)
-    bb_list = results.pandas().xyxy[0].values.tolist()
-    if len(bb_list) == 0 or len(bb_list) < 7 or len(bb_list) > 10:
-        return "unknown"
-    center_list = []
-    y_mean = 0
-    y_sum = 0
-    for bb in bb_list:
-        x_c = (bb[0]+bb[2])/2
-        y_c = (bb[1]+bb[3])/2
-        y_sum += y_c
-        center_list.append([x_c,y_c,bb[-1]])
-
-    # find 2 point to draw line
-    l_point = center_list[0]
-    r_point = center_list[0]
-    for cp in center_list:
-        if cp[0] < l_point[0]:
-            l_point = cp
-        if cp[0] > r_point[0]:
-            r_point = cp
-    for ct in center_list:
-        if l_point[0] != r_point[0]:
-            if (check_point_linear(ct[0], ct[1], l_point[0], l_point[1], r_point[0], r_point[1]) == False):
-                LP_type = "2"
-
-    y_mean = int(int(y_sum) / len(bb_list))
-    size = results.pandas().s
-
-    # 1 line plates and 2 line plates
-    line_1 = []
-    line_2 = []
-    license_plate = ""
-    if LP_type == "2":
-        for c in center_list:
-            if int(c[1]) > y_mean:
-                line_2.append(c)
-            else:
-                line_1.append(c)
-        for l1 in sorted(line_1, key = lambda x: x[0]):
-            license_plate += str(l1[2])
-        license_plate += "-"
-        for l2 in sorted(line_2, key = lambda x: x[0]):
-            license_plate += str(l2[2])
-    else:
-        for l in sorted(center_list, key = lambda x: x[0]):
-            license_plate += str(l[2])
-    return license_plate
+    return decode_plate(prediction_to_numpy(results.xyxy[0]), results.names)
+
+def read_plates_batch(yolo_license_plate, images):
+    """
+    Read several plate crops with a single OCR forward pass
+    Args:
+        yolo_license_plate: OCR model
+        images: List of plate crops (any size)
+
+    Returns:
+        List of (plate, confidence, chars, boxes) tuples, plate is "unknown" when unreadable,
+        confidence is the mean confidence of the chosen characters, chars the decode_plate_chars
+        output and boxes the (grouped) character boxes in crop pixels
+    """
+    if len(images) == 0:
+        return []
+
+    # Same-size inputs let AutoShape stack them into one batch without extra padding
+    boxed = [letterbox_crop(im, OCR_INPUT_SIZE) for im in images]
+    results = yolo_license_plate([b[0] for b in boxed], size=OCR_INPUT_SIZE)
+
+    plates = []
+    for (_, ratio, (pad_x, pad_y)), pred in zip(boxed, results.xyxy):
+        boxes = prediction_to_numpy(pred)
+        # Map character boxes back to crop pixels, the one-line test's tolerance is in pixels
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / ratio
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad_y) / ratio
+        boxes, candidates = group_char_candidates(boxes, results.names)
+        plate_chars = decode_plate_chars(boxes, results.names, candidates)
+        if plate_chars is None:
+            plates.append(("unknown", 0.0, None, boxes))
+        else:
+            plate = "".join(char for char, _ in plate_chars)
+            confidence = float(np.mean([conf for char, conf in plate_chars if char != "-"]))
+            plates.append((plate, confidence, plate_chars, boxes))
+    return plates
+
+def is_valid_plate(plate):
+    """Check the Vietnamese plate format"""
+    return re.match(VIETNAM_PLATE_REGEX, plate) is not None
+
+def matches_plate_grammar(plate):
+    """A reading the grammar decode resolved, line separator ignored"""
+    return is_valid_plate(plate.replace("-", ""))
+
+# --------- PER-TRACK PLATE CACHE ---------
+
+class PlateCache:
+    """
+    Best plate reading per (camera_id, track_id), voted by OCR confidence and expiring after a TTL
+    """
+
+    def __init__(self, ttl, min_confidence, max_size):
+        self.ttl = ttl
+        self.min_confidence = min_confidence
+        self.max_size = max_size
+        self.entries = dict()  # (camera_id, track_id) -> {'votes': {plate: confidence sum}, 'counts': {plate: reads}, 'last_seen'}
+        self.lock = threading.Lock()
+        self.stats = {'vehicles': 0, 'hits': 0, 'weak': 0, 'misses': 0, 'ocr_vehicles': 0}
+
+    def _best(self, entry):
+        plate = max(entry['votes'], key=entry['votes'].get)
+        # Average confidence the winning plate was read with
+        return plate, entry['votes'][plate] / entry['counts'][plate]
+
+    def lookup(self, camera_id, track_id, now=None):
+        """
+        Returns:
+            The cached plate if it is fresh and confident enough to skip OCR, else None
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            self.stats['vehicles'] += 1
+            entry = self.entries.get((camera_id, track_id))
+            if entry is None or now - entry['last_seen'] > self.ttl:
+                self.stats['misses'] += 1
+                return None
+            entry['last_seen'] = now
+            plate, confidence = self._best(entry)
+            if confidence < self.min_confidence:
+                self.stats['weak'] += 1
+                return None
+            self.stats['hits'] += 1
+            return plate
+
+    def vote(self, camera_id, track_id, plate, confidence, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            key = (camera_id, track_id)
+            entry = self.entries.get(key)
+            if entry is None or now - entry['last_seen'] > self.ttl:
+                entry = {'votes': dict(), 'counts': dict(), 'last_seen': now}
+                self.entries[key] = entry
+            entry['votes'][plate] = entry['votes'].get(plate, 0.0) + confidence
+            entry['counts'][plate] = entry['counts'].get(plate, 0) + 1
+            entry['last_seen'] = now
+            if len(self.entries) > self.max_size:
+                self._purge(now)
+            return self._best(entry)[0]
+
+    def record_ocr(self, vehicle_count):
+        with self.lock:
+            self.stats['ocr_vehicles'] += vehicle_count
+
+    def _purge(self, now):
+        expired = [key for key, entry in self.entries.items() if now - entry['last_seen'] > self.ttl]
+        for key in expired:
+            del self.entries[key]
+        # Still too big: drop the least recently seen tracks
+        if len(self.entries) > self.max_size:
+            oldest = sorted(self.entries, key=lambda key: self.entries[key]['last_seen'])
+            for key in oldest[:len(self.entries) - self.max_size]:
+                del self.entries[key]
+
+    def summary(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['tracks'] = len(self.entries)
+        avoided = stats['hits'] / stats['vehicles'] * 100 if stats['vehicles'] else 0.0
+        return (f"vehicles={stats['vehicles']} hits={stats['hits']} weak={stats['weak']} "
+                f"misses={stats['misses']} ocr_vehicles={stats['ocr_vehicles']} "
+                f"tracks={stats['tracks']} ocr_avoided={avoided:.1f}%")
+
+plate_cache = PlateCache(PLATE_CACHE_TTL, PLATE_CACHE_MIN_CONFIDENCE, PLATE_CACHE_MAX_SIZE)
+
+# --------- MULTI-FRAME CONSENSUS OCR ---------
+
+def align_to_reference(reference, reading):
+    """
+    Align a reading to a reference with an edit-distance alignment
+    Args:
+        reference, reading: Lists of (character, confidence)
+
+    Returns:
+        List the length of reference holding the reading's aligned (character, confidence),
+        or None where the reading skipped that position; extra reading characters are dropped
+    """
+    n, m = len(reference), len(reading)
+    cost = np.zeros((n + 1, m + 1), dtype=np.int32)
+    cost[:, 0] = np.arange(n + 1)
+    cost[0, :] = np.arange(m + 1)
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            substitution = cost[i - 1, j - 1] + (reference[i - 1][0] != reading[j - 1][0])
+            cost[i, j] = min(substitution, cost[i - 1, j] + 1, cost[i, j - 1] + 1)
+
+    aligned = [None] * n
+    i, j = n, m
+    while i > 0 and j > 0:
+        if cost[i, j] == cost[i - 1, j - 1] + (reference[i - 1][0] != reading[j - 1][0]):
+            aligned[i - 1] = reading[j - 1]
+            i, j = i - 1, j - 1
+        elif cost[i, j] == cost[i - 1, j] + 1:
+            i -= 1
+        else:
+            j -= 1
+    return aligned
+
+def vote_characters(readings):
+    """
+    Confidence-weighted vote per character position
+    Returns:
+        (plate, agreement) where agreement is the smallest winning vote share over positions
+    """
+    # The reference is the most confident reading of the most common length
+    lengths = [len(reading) for reading in readings]
+    common_length = max(set(lengths), key=lengths.count)
+    reference = max((reading for reading in readings if len(reading) == common_length),
+                    key=lambda reading: sum(conf for _, conf in reading))
+
+    votes = [dict() for _ in reference]
+    for reading in readings:
+        weight = sum(conf for _, conf in reading) / len(reading)
+        for position, token in enumerate(align_to_reference(reference, reading)):
+            # A skipped position votes for dropping the character, with the reading's mean confidence
+            char, conf = token if token is not None else ("", weight)
+            votes[position][char] = votes[position].get(char, 0.0) + conf
+
+    plate = ""
+    agreement = 1.0
+    for position_votes in votes:
+        char = max(position_votes, key=position_votes.get)
+        agreement = min(agreement, position_votes[char] / sum(position_votes.values()))
+        plate += char
+    return plate, agreement
+
+class PlateConsensus:
+    """
+    Recent OCR readings per (camera_id, track_id), finalized once they agree character by character
+    """
+
+    def __init__(self, min_readings, max_readings, agreement, window):
+        self.min_readings = min_readings
+        self.max_readings = max_readings
+        self.agreement = agreement
+        self.window = window
+        self.tracks = dict()  # (camera_id, track_id) -> {'readings': [...], 'last_seen'}
+        self.lock = threading.Lock()
+
+    def _entry(self, key, now):
+        entry = self.tracks.get(key)
+        if entry is None or now - entry['last_seen'] > self.window:
+            entry = {'readings': [], 'last_seen': now}
+            self.tracks[key] = entry
+        return entry
+
+    def has_readings(self, camera_id, track_id, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.tracks.get((camera_id, track_id))
+            return entry is not None and now - entry['last_seen'] <= self.window and len(entry['readings']) > 0
+
+    def add(self, camera_id, track_id, readings, now=None):
+        """
+        Add this event's readings of a track's plate
+        Returns:
+            (plate, agreement) once the consensus is final, else None
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self._entry((camera_id, track_id), now)
+            entry['readings'].extend(readings)
+            entry['readings'] = entry['readings'][-self.max_readings:]
+            entry['last_seen'] = now
+            self._purge(now)
+
+            if len(entry['readings']) < self.min_readings:
+                return None
+            plate, agreement = vote_characters(entry['readings'])
+            if agreement < self.agreement or not is_valid_plate(plate):
+                return None
+            return plate, agreement
+
+    def _purge(self, now):
+        expired = [key for key, entry in self.tracks.items() if now - entry['last_seen'] > self.window]
+        for key in expired:
+            del self.tracks[key]
+
+plate_consensus = PlateConsensus(CONSENSUS_MIN_READINGS, CONSENSUS_MAX_READINGS, CONSENSUS_AGREEMENT, CONSENSUS_WINDOW)
+
+# --------- VIOLATION EVENT ADMISSION AND QUEUE ---------
+
+class TokenBucket:
+    """Admits up to rate events per second with bursts of up to burst events"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+
+    def take(self, now=None):
+        now = time.time() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+class ViolationQueue:
+    """
+    Bounded priority queue of violation events for the OCR workers
+
+    Events are ordered by priority * PRIORITY_AGING + arrival time, so an event that has
+    waited PRIORITY_AGING seconds catches up with a fresh event one level more urgent.
+    Reading a plate is useless once Node has dropped the evidence frame from Redis, so
+    events within EVIDENCE_EXPIRY_MARGIN of that are the first dropped when the queue is
+    full and are skipped by get(); otherwise the least urgent event is dropped.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.heap = []  # (key, sequence, evidence deadline, event)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.stats = {'expired': 0, 'evicted': 0}
+
+    def qsize(self):
+        with self.condition:
+            return len(self.heap)
+
+    def _drop_expiring(self, now):
+        kept = [entry for entry in self.heap if entry[2] - now >= EVIDENCE_EXPIRY_MARGIN]
+        self.stats['expired'] += len(self.heap) - len(kept)
+        if len(kept) != len(self.heap):
+            self.heap = kept
+            heapq.heapify(self.heap)
+
+    def put(self, event, priority, created_at):
+        """
+        Queue an event without blocking
+        Args:
+            priority: Base priority, lower is more urgent
+            created_at: Capture time of the evidence frame in seconds
+
+        Returns:
+            False if the event was dropped instead of queued
+        """
+        now = time.time()
+        entry = (priority * PRIORITY_AGING + now, next(self.sequence), created_at + EVIDENCE_TTL, event)
+        with self.condition:
+            if entry[2] - now < EVIDENCE_EXPIRY_MARGIN:
+                self.stats['expired'] += 1
+                return False
+            if len(self.heap) >= self.maxsize:
+                self._drop_expiring(now)
+            if len(self.heap) >= self.maxsize:
+                worst = max(range(len(self.heap)), key=lambda i: self.heap[i][:2])
+                if self.heap[worst][:2] < entry[:2]:
+                    return False
+                self.heap[worst] = self.heap[-1]
+                self.heap.pop()
+                heapq.heapify(self.heap)
+                self.stats['evicted'] += 1
+            heapq.heappush(self.heap, entry)
+            self.condition.notify()
+        return True
+
+    def get(self, timeout=None):
+        """Most urgent event whose evidence is still available, raises queue.Empty on timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while True:
+                now = time.time()
+                while self.heap:
+                    _, _, evidence_deadline, event = heapq.heappop(self.heap)
+                    if evidence_deadline - now >= EVIDENCE_EXPIRY_MARGIN:
+                        return event
+                    self.stats['expired'] += 1
+                if deadline is not None and now >= deadline:
+                    raise queue.Empty
+                self.condition.wait(None if deadline is None else deadline - now)
+
+plate_queue = ViolationQueue(QUEUE_SIZE)
+camera_buckets = dict()  # camera_id -> TokenBucket
+
+# --------- PER-FRAME CACHE ---------
+
+def vehicle_key(detection):
+    """Identify a vehicle within one frame by its track id and normalized bbox"""
+    bbox = detection.get("bbox") or {}
+    return detection.get("id"), tuple(round(float(bbox.get(k, 0.0)), 4) for k in ("x1", "y1", "x2", "y2"))
+
+class FrameCache:
+    """
+    LRU of recently processed violation frames, keyed by image_id or a hash of the buffer
+
+    Each entry holds the decoded (size-limited) frame, the plate detector output
+    ('full_frame_plates', or 'vehicle_plates' per vehicle_key) and the reading per
+    vehicle_key, so another event for the same frame only detects and reads the
+    vehicles it has not seen yet.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def key(self, image_id, buffer):
+        if image_id is not None:
+            return image_id
+        return hashlib.blake2b(buffer, digest_size=16).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key, image):
+        entry = {'image': image, 'full_frame_plates': None, 'vehicle_plates': dict(), 'readings': dict()}
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return entry
+
+frame_cache = FrameCache(FRAME_CACHE_SIZE)
 
 # --------- MAIN LICENSE PLATE RECOGNITION CODE (from ocr.py) ---------
 
-def load_models():
+def get_device():
+    device = 'cpu'
+    if ENABLE_GPU:
+        try:
+            if torch.cuda.is_available():
+                device = 'cuda'
+                gpu_name = torch.cuda.get_device_name(0)
+                print(f"CUDA is available. Using GPU: {gpu_name}")
+            else:
+                print("CUDA is not available. Using CPU.")
+        except Exception as e:
+            print(f"Error checking GPU: {e}. Using CPU.")
+    return device
+
+def exported_model_path(weights_path, backend):
+    """Where export_plate_models.py writes the INT8 model for a .pt file and backend"""
+    stem = os.path.splitext(weights_path)[0]
+    if backend == "openvino":
+        return f"{stem}_int8_openvino_model"
+    if backend == "onnx":
+        return f"{stem}_int8.onnx"
+    return weights_path
+
+def hub_load(path):
+    return torch.hub.load('yolov5', 'custom', path=path, force_reload=False, source='local', verbose=False)
+
+def hub_module(model):
+    """The DetectionModel inside a hub model (AutoShape -> DetectMultiBackend)"""
+    return model.model.model
+
+def load_model_replica(backend=None):
     """
-    Load YOLO models once and cache them for future use
+    Load one detector + OCR model pair
+    Args:
+        backend: "pytorch", "openvino" or "onnx", defaults to MODEL_BACKEND
+
     Returns:
         Detector model and OCR model
     """
-    global yolo_LP_detect, yolo_license_plate
-    
-    # Check if models are already loaded
-    if yolo_LP_detect is not None and yolo_license_plate is not None:
-        return yolo_LP_detect, yolo_license_plate
-    
+    backend = backend or MODEL_BACKEND
+    detector_path = exported_model_path(DETECTOR_PATH, backend)
+    ocr_path = exported_model_path(OCR_PATH, backend)
+    if not os.path.exists(detector_path) or not os.path.exists(ocr_path):
+        print(f"Exported {backend} models not found, run export_plate_models.py. Falling back to PyTorch models.")
+        backend, detector_path, ocr_path = "pytorch", DETECTOR_PATH, OCR_PATH
+
     # Temporarily redirect stdout to suppress YOLOv5 loading messages
     import sys
-    import os
     original_stdout = sys.stdout
     sys.stdout = open(os.devnull, 'w')
     
     try:
-        print("Loading license plate detection models (first time)...")
         # Configure device
-        device = 'cpu'
-        if ENABLE_GPU:
-            try:
-                if torch.cuda.is_available():
-                    device = 'cuda'
-                    gpu_name = torch.cuda.get_device_name(0)
-                    print(f"CUDA is available. Using GPU: {gpu_name}")
-                else:
-                    print("CUDA is not available. Using CPU.")
-            except Exception as e:
-                print(f"Error checking GPU: {e}. Using CPU.")
+        device = get_device()
         
-        # Load YOLO models using the global constants with verbose=False
-        yolo_LP_detect = torch.hub.load('yolov5', 'custom', path=DETECTOR_PATH, force_reload=False, source='local', verbose=False)
-        yolo_license_plate = torch.hub.load('yolov5', 'custom', path=OCR_PATH, force_reload=False, source='local', verbose=False)
+        # Load YOLO models with verbose=False, exported models go through DetectMultiBackend + AutoShape too
+        if backend == "pytorch":
+            # Fused artifacts with memory-mapped weights: replicas and other processes share the pages
+            detector = load_shared(detector_path, hub_load, hub_module)
+            ocr = load_shared(ocr_path, hub_load, hub_module)
+        else:
+            detector = hub_load(detector_path)
+            ocr = hub_load(ocr_path)
         
-        # Move models to appropriate device
-        yolo_LP_detect.to(device)
-        yolo_license_plate.to(device)
-        
-        # Use half precision for faster inference if using GPU and enabled
-        if device == 'cuda' and USE_HALF_PRECISION:
-            yolo_LP_detect = yolo_LP_detect.half()
-            yolo_license_plate = yolo_license_plate.half()
+        if backend == "pytorch":
+            # Move models to appropriate device
+            detector.to(device)
+            ocr.to(device)
+            
+            # Use half precision for faster inference if using GPU and enabled
+            if device == 'cuda' and USE_HALF_PRECISION:
+                detector = detector.half()
+                ocr = ocr.half()
         
-        # Set model confidence threshold
-        yolo_license_plate.conf = CONFIDENCE_THRESHOLD
-
-        # Start model threads
-        model_thread = threading.Thread(target=process_license_plates_thread, daemon=True)
-        model_thread.start()
+        # Keep every class above OCR_CANDIDATE_CONFIDENCE per character box for the grammar decode,
+        # group_char_candidates applies CONFIDENCE_THRESHOLD to each character's best class
+        ocr.conf = OCR_CANDIDATE_CONFIDENCE
+        ocr.multi_label = True
     finally:
         # Restore stdout
         sys.stdout.close()
         sys.stdout = original_stdout
     
+    return detector, ocr
+
+def load_models():
+    """
+    Load YOLO models once and cache them for future use
+    Returns:
+        Detector model and OCR model
+    """
+    global yolo_LP_detect, yolo_license_plate
+    
+    # Check if models are already loaded
+    if yolo_LP_detect is not None and yolo_license_plate is not None:
+        return yolo_LP_detect, yolo_license_plate
+    
+    # Concurrent first callers wait for one load instead of each loading the models
+    def load():
+        print("Loading license plate detection models (first time)...")
+        return load_model_replica()
+    yolo_LP_detect, yolo_license_plate = model_registry.get('license_plate', load)
+
+    if SAVE_CROPS:
+        debug_sink.start()
+    
     return yolo_LP_detect, yolo_license_plate
 
-def recognize_license_plate(image_path=None, image_array=None, detections=None):
+def clamp_plate_box(plate, img, offset_x=0, offset_y=0):
+    """Convert a detector row to an in-image (x, y, w, h) box, None if too small to read"""
+    x = int(plate[0] + offset_x)  # xmin
+    y = int(plate[1] + offset_y)  # ymin
+    w = int(plate[2] - plate[0])  # xmax - xmin
+    h = int(plate[3] - plate[1])  # ymax - ymin
+
+    # Ensure crop coordinates are within image boundaries
+    x = max(0, x)
+    y = max(0, y)
+    w = min(w, img.shape[1] - x)
+    h = min(h, img.shape[0] - y)
+
+    # Skip if crop dimensions are too small
+    if w < 20 or h < 10:
+        return None
+    return x, y, w, h
+
+def vehicle_box(detection, frame_width, frame_height):
+    bbox = detection.get("bbox")
+    return (bbox.get("x1") * frame_width, bbox.get("y1") * frame_height,
+            bbox.get("x2") * frame_width, bbox.get("y2") * frame_height)
+
+def detect_plates_full_frame(detector, img, detections, frame=None):
+    """
+    Run the plate detector on the whole frame at INPUT_SIZE
+    Args:
+        frame: FrameCache entry, the detector runs once per frame
+    Returns:
+        List of (x, y, w, h, vehicle_id) for plates inside one of the detections
+    """
+    frame_height, frame_width = img.shape[:2]
+    if frame is not None and frame['full_frame_plates'] is not None:
+        boxes = frame['full_frame_plates']
+    else:
+        plates = detector(img, size=INPUT_SIZE)
+        boxes = []
+        for plate in prediction_to_numpy(plates.xyxy[0]):
+            # Only process if confidence is above threshold
+            if float(plate[4]) < CONFIDENCE_THRESHOLD:
+                continue
+            box = clamp_plate_box(plate, img)
+            if box is not None:
+                boxes.append(box)
+        if frame is not None:
+            frame['full_frame_plates'] = boxes
+
+    plate_boxes = []
+    for x, y, w, h in boxes:
+
+        # Skip if license plate is outside valid area
+        vehicle_id = None
+        if detections is not None:
+            is_inside_valid_area = False
+
+            for detection in detections:
+                x1, y1, x2, y2 = vehicle_box(detection, frame_width, frame_height)
+                if x >= x1 and x + w <= x2 and y >= y1 and y + h <= y2:
+                    is_inside_valid_area = True
+                    vehicle_id = detection.get("id")
+                    break
+
+            if not is_inside_valid_area:
+                continue
+        plate_boxes.append((x, y, w, h, vehicle_id))
+    return plate_boxes
+
+def choose_crop_detect_size(crop_height, crop_width):
+    longest = max(crop_height, crop_width)
+    for size in VEHICLE_CROP_SIZES:
+        if longest <= size:
+            return size
+    return VEHICLE_CROP_SIZES[-1]
+
+def crop_vehicle(img, detection):
+    """
+    Cut a vehicle out of the frame with VEHICLE_CROP_MARGIN on each side
+    Returns:
+        (vehicle box, (crop_x1, crop_y1), crop) in frame pixels, or None when the crop is too small
+    """
+    frame_height, frame_width = img.shape[:2]
+    x1, y1, x2, y2 = vehicle_box(detection, frame_width, frame_height)
+    margin_x = (x2 - x1) * VEHICLE_CROP_MARGIN
+    margin_y = (y2 - y1) * VEHICLE_CROP_MARGIN
+    crop_x1 = max(0, int(x1 - margin_x))
+    crop_y1 = max(0, int(y1 - margin_y))
+    crop_x2 = min(frame_width, int(math.ceil(x2 + margin_x)))
+    crop_y2 = min(frame_height, int(math.ceil(y2 + margin_y)))
+    if crop_x2 - crop_x1 < 20 or crop_y2 - crop_y1 < 10:
+        return None
+    return (x1, y1, x2, y2), (crop_x1, crop_y1), img[crop_y1:crop_y2, crop_x1:crop_x2]
+
+def detect_plates_in_vehicles(detector, img, detections, frame=None):
+    """
+    Run the plate detector only on the violating vehicles' crops, batched per detector size
+    Args:
+        frame: FrameCache entry, vehicles already searched in this frame reuse their plates
+    Returns:
+        List of (x, y, w, h, vehicle_id) in frame coordinates
+    """
+    searched = frame['vehicle_plates'] if frame is not None else dict()
+    plate_boxes = []
+
+    # Group vehicle crops by the detector size their dimensions call for
+    crops_by_size = dict()
+    for detection in detections:
+        key = vehicle_key(detection)
+        if key in searched:
+            plate_boxes.extend((x, y, w, h, detection.get("id")) for x, y, w, h in searched[key])
+            continue
+        vehicle_crop = crop_vehicle(img, detection)
+        if vehicle_crop is None:
+            continue
+        box, offset, crop = vehicle_crop
+        size = choose_crop_detect_size(*crop.shape[:2])
+        crops_by_size.setdefault(size, []).append((detection.get("id"), key, box, offset, crop))
+
+    for size, entries in crops_by_size.items():
+        results = detector([entry[4] for entry in entries], size=size)
+        for (vehicle_id, key, (x1, y1, x2, y2), (offset_x, offset_y), _), pred in zip(entries, results.xyxy):
+            found = []
+            for plate in prediction_to_numpy(pred):
+                if float(plate[4]) < CONFIDENCE_THRESHOLD:
+                    continue
+                box = clamp_plate_box(plate, img, offset_x, offset_y)
+                if box is None:
+                    continue
+                x, y, w, h = box
+                # The margin can reach a neighbour's plate, keep only this vehicle's own
+                if x >= x1 and x + w <= x2 and y >= y1 and y + h <= y2:
+                    found.append(box)
+            searched[key] = found
+            plate_boxes.extend((x, y, w, h, vehicle_id) for x, y, w, h in found)
+    return plate_boxes
+
+def limit_frame_size(img):
+    """Downscale frames larger than Full HD for faster processing"""
+    frame_height, frame_width = img.shape[:2]
+    if max(frame_height, frame_width) > 1920:
+        scale = 1920 / max(frame_height, frame_width)
+        img = cv2.resize(img, (int(frame_width * scale), int(frame_height * scale)))
+    return img
+
+def recognize_license_plate(image_path=None, image_array=None, detections=None, camera_id=None, models=None,
+                            frame=None, confidences=None):
     """
     Recognize license plates from either an image path or image array
     Args:
         image_path: Path to the image file
         image_array: OpenCV image array (if image_path is None)
+        detections: Violating vehicles; plates outside them are ignored
+        camera_id: Camera the frame came from, enables the per-track plate cache
+        models: (detector, ocr) replica to use, defaults to the shared cached models
+        frame: FrameCache entry for image_array, reused across events for the same frame
+        confidences: Optional dict filled with vehicle_id -> confidence for plates read in this call
     
     Returns:
         A set of detected license plate numbers
     """
-    global yolo_LP_detect, yolo_license_plate
+    detector, ocr = models if models is not None else (yolo_LP_detect, yolo_license_plate)
     
     # Read the image
     if image_path is not None:
@@ -264,95 +1036,112 @@ def recognize_license_plate(image_path=None, image_array=None, detections=None):
         return set(), None
     
     # Resize image if it's too large (for faster processing)
-    frame_height, frame_width = img.shape[:2]
-    if max(frame_height, frame_width) > 1920:  # If the image is larger than Full HD
-        scale = 1920 / max(frame_height, frame_width)
-        new_frame_width = int(frame_width * scale)
-        new_frame_height = int(frame_height * scale)
-        img = cv2.resize(img, (new_frame_width, new_frame_height))
-    
-    # Create a copy for visualization
-    vis_img = img.copy()
-    
-    # Detect license plates with optimized size
-    plates = yolo_LP_detect(img, size=INPUT_SIZE)
+    img = limit_frame_size(img)
     
-    # Process detection results
-    list_plates = plates.pandas().xyxy[0].values.tolist()
     list_read_plates = dict()
-    
-    # Process each detected license plate
-    detection_ids = [detection.get("id") for detection in detections]
-    valid_areas = [detection for detection in detections if detection.get("id") in detection_ids]
-
-    crop_images = dict()
 
+    # Vehicles read by an earlier event for this frame reuse that reading (or lack of one)
+    if frame is not None and detections:
+        pending = []
+        for detection in detections:
+            key = vehicle_key(detection)
+            if key not in frame['readings']:
+                pending.append(detection)
+            elif frame['readings'][key] is not None:
+                list_read_plates[detection.get("id")] = frame['readings'][key]
+        detections = pending
+        if len(detections) == 0:
+            return list_read_plates
 
-    for plate in list_plates:
-        # Only process if confidence is above threshold
-        confidence = float(plate[4])
-        if confidence < CONFIDENCE_THRESHOLD:
-            continue
-            
-        flag = 0
-        x = int(plate[0])  # xmin
-        y = int(plate[1])  # ymin
-        w = int(plate[2] - plate[0])  # xmax - xmin
-        h = int(plate[3] - plate[1])  # ymax - ymin  
-        
-        # Ensure crop coordinates are within image boundaries
-        x = max(0, x)
-        y = max(0, y)
-        w = min(w, img.shape[1] - x)
-        h = min(h, img.shape[0] - y)
-        
-        # Skip if crop dimensions are too small
-        if w < 20 or h < 10:
-            continue
-
-        # Skip if license plate is outside valid area
-        vehicle_id = None
-        if valid_areas is not None:
-            is_inside_valid_area = False
+    # Vehicles whose track already has a confident reading skip detection and OCR
+    use_cache = ENABLE_PLATE_CACHE and camera_id is not None and detections is not None
+    if use_cache:
+        pending = []
+        for detection in detections:
+            track_id = detection.get("id")
+            cached = plate_cache.lookup(camera_id, track_id) if track_id is not None else None
+            if cached is not None:
+                list_read_plates[track_id] = cached
+            else:
+                pending.append(detection)
+        detections = pending
+        plate_cache.record_ocr(len(detections))
+        if len(detections) == 0:
+            return list_read_plates
 
-            for valid_area in valid_areas:
-                x1 = valid_area.get("bbox").get("x1") * frame_width
-                x2 = valid_area.get("bbox").get("x2") * frame_width
-                y1 = valid_area.get("bbox").get("y1") * frame_height
-                y2 = valid_area.get("bbox").get("y2") * frame_height
+    # Find plates and the vehicle each one belongs to; with no vehicle left to read there
+    # is nothing to assign a plate to, only a missing vehicle list falls back to the full frame
+    if PLATE_DETECT_MODE == "vehicle_crops" and detections is not None:
+        if len(detections) == 0:
+            return list_read_plates
+        plate_boxes = detect_plates_in_vehicles(detector, img, detections, frame)
+    else:
+        plate_boxes = detect_plates_full_frame(detector, img, detections, frame)
 
-                if x >= x1 and x + w <= x2 and y >= y1 and y + h <= y2:
-                    is_inside_valid_area = True
-                    vehicle_id = valid_area.get("id")
-                    break
+    crop_candidates = []
 
-            if not is_inside_valid_area:
-                continue
-        
+    for x, y, w, h, vehicle_id in plate_boxes:
         # Crop the license plate
         crop_img = img[y:y+h, x:x+w]
-        
-        # Save the cropped image (for debugging) - only if enabled
+        crop_candidates.append((vehicle_id, crop_img))
+
+    # Tracked plates that already have readings are voted across frames instead of
+    # retried with deskew variants within this frame
+    use_consensus = ENABLE_PLATE_CONSENSUS and camera_id is not None
+
+    # OCR the raw crops first; the grammar decode resolves most of them, so only crops
+    # without a plate-shaped reading pay for a second batch of deskew variants
+    raw_results = read_plates_batch(ocr, [crop_img for _, crop_img in crop_candidates])
+    retry_inputs = []
+    retry_slices = []
+    for (vehicle_id, crop_img), (lp, _, _, _) in zip(crop_candidates, raw_results):
+        start = len(retry_inputs)
+        tracked = use_consensus and vehicle_id is not None and plate_consensus.has_readings(camera_id, vehicle_id)
+        if not tracked and not matches_plate_grammar(lp):
+            retry_inputs.extend(deskew_variants(crop_img))
+        retry_slices.append((start, len(retry_inputs)))
+    retry_results = read_plates_batch(ocr, retry_inputs)
+
+    for (vehicle_id, crop_img), raw_result, (start, end) in zip(crop_candidates, raw_results, retry_slices):
+        crop_results = [raw_result] + retry_results[start:end]
+
+        # Save the cropped image (for debugging) - only if enabled, written off this thread
         if SAVE_CROPS:
-            crop_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crop.jpg")
-            cv2.imwrite(crop_file, crop_img)
-        
-        # Optimize the deskew process - try fewer orientations for speed
-        # First try without deskew, which is fastest
-        lp = read_plate(yolo_license_plate, crop_img)
-        if lp != "unknown":
-            list_read_plates[vehicle_id] = lp
-            continue
-        
-        # If not successful, try deskew with fewer combinations for better speed
-        for cc in range(0, 2):
-            lp = read_plate(yolo_license_plate, deskew(crop_img, cc, 0))
-            if lp != "unknown":
+            debug_sink.submit(camera_id if camera_id is not None else "unknown", crop_img, {
+                'vehicle_id': vehicle_id,
+                'readings': [
+                    {'plate': lp, 'confidence': confidence, 'boxes': boxes[:, :5].round(2).tolist()}
+                    for lp, confidence, _, boxes in crop_results
+                ],
+            })
+
+        if use_consensus and vehicle_id is not None:
+            readings = [plate_chars for lp, _, plate_chars, _ in crop_results if lp != "unknown"]
+            final = plate_consensus.add(camera_id, vehicle_id, readings) if readings else None
+            if final is not None:
+                lp, agreement = final
+                if use_cache:
+                    lp = plate_cache.vote(camera_id, vehicle_id, lp, agreement)
                 list_read_plates[vehicle_id] = lp
-                flag = 1
-                break
-            if flag == 1:
-                break
+                if confidences is not None:
+                    confidences[vehicle_id] = agreement
+            continue
+
+        # Prefer the first plate-shaped reading, then the first readable one
+        readable = [result for result in crop_results if result[0] != "unknown"]
+        shaped = [result for result in readable if matches_plate_grammar(result[0])]
+        if readable:
+            lp, confidence = (shaped or readable)[0][:2]
+            # Tracked vehicles report the plate with the most confidence votes so far
+            if use_cache and vehicle_id is not None and is_valid_plate(lp):
+                lp = plate_cache.vote(camera_id, vehicle_id, lp, confidence)
+            list_read_plates[vehicle_id] = lp
+            if confidences is not None:
+                confidences[vehicle_id] = confidence
+
+    if frame is not None and detections is not None:
+        for detection in detections:
+            frame['readings'][vehicle_key(detection)] = list_read_plates.get(detection.get("id"))
     
     return list_read_plates
 
@@ -423,124 +1212,231 @@ def on_license_plate(data):
     Args:
         data: Dictionary containing license plate data with image
     """
-    global last_processing_time
-
     print("Received license plate event")
 
-    camera_id = data.get('camera_id')
-    image_id = data.get('image_id')
-    violations = data.get('violations')
-    buffer = data.get('buffer')
-    detections = data.get('detections')
-
-    # Limit processing rate to avoid overload
-    current_time = time.time()
-    if current_time - last_processing_time < 1.0/MAX_FPS:
-        return  # Skip this frame to maintain reasonable frame rate
-    
-    last_processing_time = current_time
-    
     try:
         # Check if we have a valid license plate event with image data
         if not isinstance(data, dict):
             print("Warning: Received license_plate event with invalid data format")
             return
-        
+
+        camera_id = data.get('camera_id')
+        image_id = data.get('image_id')
+        violations = data.get('violations') or []
+        buffer = data.get('buffer')
+        detections = data.get('detections')
+
+        # Limit each camera's rate so one busy camera can't starve the others
+        with stats_lock:
+            bucket = camera_buckets.get(camera_id)
+            if bucket is None:
+                bucket = camera_buckets[camera_id] = TokenBucket(CAMERA_EVENT_RATE, CAMERA_EVENT_BURST)
+            if not bucket.take():
+                queue_stats['throttled'] += 1
+                return
+
+        priority = min((VIOLATION_PRIORITIES.get(v.get('type'), DEFAULT_VIOLATION_PRIORITY) for v in violations),
+                       default=DEFAULT_VIOLATION_PRIORITY)
+        # The evidence frame's age decides when Node drops it, fall back to arrival time
+        created_at = data.get('created_at')
+        created_at = created_at / 1000.0 if created_at else time.time()
+
         # Add to processing queue
-        try:
-            plate_queue.put((camera_id, image_id, violations, buffer, detections), block=False)
+        if enqueue_plate_event((camera_id, image_id, violations, buffer, detections), priority, created_at):
             print(f"Added license plate image to processing queue")
-        except queue.Full:
-            # If queue is full, just discard this data
-            pass
     
     except Exception as e:
         print(f"Error handling license_plate event: {e}")
 
-def process_license_plates_thread():
-    """Background thread to process license plate images"""
-    global running, yolo_LP_detect, yolo_license_plate
+def enqueue_plate_event(event, priority=DEFAULT_VIOLATION_PRIORITY, created_at=None):
+    """
+    Queue a plate event for the OCR workers without blocking the Socket.IO thread
+    Args:
+        priority: Base priority, lower is served first (see VIOLATION_PRIORITIES)
+        created_at: Evidence frame capture time in seconds, defaults to now
+
+    Returns:
+        False if the event was dropped instead of queued
+    """
+    if not plate_queue.put(event, priority, time.time() if created_at is None else created_at):
+        with stats_lock:
+            queue_stats['dropped'] += 1
+        return False
+    with stats_lock:
+        queue_stats['enqueued'] += 1
+    return True
+
+def decode_violation_frame(buffer):
+    """Decode a violation event's JPEG buffer, None if it is unusable"""
+    # Convert buffer to image with optimized error handling
+    try:
+        # Convert bytes to numpy array
+        nparr = np.frombuffer(buffer, np.uint8)
+        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        
+        if img is None:
+            print(f"Error: Could not decode image for plate")
+            return None
+            
+        # Check if image is too small for useful processing
+        if img.shape[0] < 20 or img.shape[1] < 20:
+            print(f"Image too small for reliable processing: {img.shape}")
+            return None
+    except Exception as e:
+        print(f"Error decoding image: {e}")
+        return None
+    return img
+
+def process_plate_event(event, models):
+    """Decode one violation event's frame, read its plates and emit the result"""
+    camera_id, image_id, violations, buffer, detections = event
+
+    frame = None
+    if ENABLE_FRAME_CACHE:
+        frame_key = frame_cache.key(image_id, buffer)
+        frame = frame_cache.get(frame_key)
+    if frame is not None:
+        img = frame['image']
+    else:
+        img = decode_violation_frame(buffer)
+        if img is None:
+            return
+        img = limit_frame_size(img)
+        if ENABLE_FRAME_CACHE:
+            frame = frame_cache.put(frame_key, img)
+    
+    # Start timing for inference
+    start_time = time.time()
     
-    print("Starting license plate OCR thread")
+    # Use our optimized recognition with this worker's models
+    confidences = dict()
+    license_plates = recognize_license_plate(image_array=img, detections=detections, camera_id=camera_id,
+                                             models=models, frame=frame, confidences=confidences)
+
+    print(license_plates)
+    
+    # Calculate inference time
+    inference_time = (time.time() - start_time) * 1000  # ms
     
-    # Pre-load models for faster inference later
-    yolo_LP_detect, yolo_license_plate = load_models()
-    print("Models loaded successfully and cached for reuse")
+    # Prepare response with recognition results and include the original data
+    plates = dict()
+    for key, value in license_plates.items():
+        # Kiểm tra định dạng biển số việt nam
+        if is_valid_plate(value):
+            plates[key] = value
+
+    if plate_index is not None:
+        for vehicle_id, plate in plates.items():
+            plate_index.add(camera_id, vehicle_id, plate, confidences.get(vehicle_id))
+
+    response = {
+        'camera_id': camera_id,
+        'image_id': image_id,
+        'inference_time': inference_time,
+        'license_plates': plates,
+        'violations': violations,
+    }
+
+    # Show detected license plates in the command line
+    print(f"[LicensePlateOCR] Camera: {camera_id}, Image: {image_id}, "
+          f"Plates: {response['license_plates']}, "
+          f"Inference Time: {inference_time:.2f}ms")
+
+    # Emit license plate OCR results using 'license_plate_ocr' event
+    sio.emit('violation_license_plate', response)
+
+def ocr_worker_thread(worker_id, models):
+    """OCR worker: blocks on the plate queue and processes events with its own model replica"""
+    global running
     
-    # Set up batch processing variables
-    batch_size = 1  # Start with single image processing
+    print(f"Starting license plate OCR worker {worker_id}")
+
+    with stats_lock:
+        worker_stats[worker_id] = {'processed': 0, 'busy': 0.0, 'started': time.time()}
     
     while running:
         try:
-            # Try to get a plate event from the queue, non-blocking
-            try:
-                camera_id, image_id, violations, buffer, detections = plate_queue.get(block=False)
-                if camera_id is None:
-                    print(camera_id)
-                    time.sleep(0.01)
-                    continue
-            except queue.Empty:
-                time.sleep(0.01)
-                continue
-            
-            # Convert buffer to image with optimized error handling
-            try:
-                # Convert bytes to numpy array
-                nparr = np.frombuffer(buffer, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if img is None:
-                    print(f"Error: Could not decode image for plate")
-                    continue
-                    
-                # Check if image is too small for useful processing
-                if img.shape[0] < 20 or img.shape[1] < 20:
-                    print(f"Image too small for reliable processing: {img.shape}")
-                    continue
-            except Exception as e:
-                print(f"Error decoding image: {e}")
-                continue
-            
-            # Start timing for inference
-            start_time = time.time()
-            
-            # Use our optimized recognition with cached models
-            license_plates = recognize_license_plate(image_array=img, detections=detections)
+            event = plate_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
 
-            print(license_plates)
-            
-            # Calculate inference time
-            inference_time = (time.time() - start_time) * 1000  # ms
-            
-            # Prepare response with recognition results and include the original data
-            plates = dict()
-            for key, value in license_plates.items():
-                # Kiểm tra định dạng biển số việt nam
-                vietnam_plate_regex = r'^[0-9]{2}[A-Z]{1,2}[0-9]{1,5}$'
-                if re.match(vietnam_plate_regex, value):
-                    plates[key] = value
-
-            response = {
-                'camera_id': camera_id,
-                'image_id': image_id,
-                'inference_time': inference_time,
-                'license_plates': plates,
-                'violations': violations,
-            }
-
-            # Show detected license plates in the command line
-            print(f"[LicensePlateOCR] Camera: {camera_id}, Image: {image_id}, "
-                  f"Plates: {response['license_plates']}, "
-                  f"Inference Time: {inference_time:.2f}ms")
-
-            # Emit license plate OCR results using 'license_plate_ocr' event
-            sio.emit('violation_license_plate', response)
-            
+        busy_start = time.time()
+        try:
+            process_plate_event(event, models)
         except Exception as e:
-            print(f"Error in license plate OCR thread: {e}")
-            time.sleep(0.1)  # Prevent tight loop if there's an error
+            print(f"Error in license plate OCR worker {worker_id}: {e}")
+        busy = time.time() - busy_start
+
+        with stats_lock:
+            worker_stats[worker_id]['processed'] += 1
+            worker_stats[worker_id]['busy'] += busy
+            queue_stats['processed'] += 1
+            processed_events = queue_stats['processed']
+        if ENABLE_PLATE_CACHE and processed_events % PLATE_CACHE_STATS_INTERVAL == 0:
+            print(f"[PlateCache] {plate_cache.summary()}")
     
-    print("License plate OCR thread stopped")
+    print(f"License plate OCR worker {worker_id} stopped")
+
+def get_worker_stats():
+    """Queue depth, drops and per-worker utilization (busy time / time alive)"""
+    now = time.time()
+    with stats_lock:
+        return {
+            'queue_depth': plate_queue.qsize(),
+            'queue_size': QUEUE_SIZE,
+            'enqueued': queue_stats['enqueued'],
+            'dropped': queue_stats['dropped'],
+            'throttled': queue_stats['throttled'],
+            'expired': plate_queue.stats['expired'],
+            'evicted': plate_queue.stats['evicted'],
+            'processed': queue_stats['processed'],
+            'frame_cache': dict(frame_cache.stats),
+            'workers': {
+                worker_id: {
+                    'processed': stats['processed'],
+                    'utilization': stats['busy'] / max(now - stats['started'], 1e-6),
+                }
+                for worker_id, stats in worker_stats.items()
+            },
+        }
+
+def report_worker_stats_thread():
+    """Periodically print queue and worker utilization for sizing OCR_WORKERS"""
+    while running:
+        time.sleep(WORKER_STATS_INTERVAL)
+        stats = get_worker_stats()
+        workers = ", ".join(f"w{worker_id}={w['utilization'] * 100:.0f}% ({w['processed']})"
+                            for worker_id, w in sorted(stats['workers'].items()))
+        print(f"[PlateWorkers] depth={stats['queue_depth']}/{stats['queue_size']} "
+              f"enqueued={stats['enqueued']} dropped={stats['dropped']} throttled={stats['throttled']} "
+              f"expired={stats['expired']} evicted={stats['evicted']} "
+              f"frame_hits={stats['frame_cache']['hits']} {workers}")
+
+def start_ocr_workers():
+    """Start the OCR worker pool and its stats reporter"""
+    # Replicas are loaded here, one after another: loading swaps sys.stdout, which is not thread-safe.
+    # Worker 0 shares the cached models, the others get their own replica
+    # The intra-op thread count is process-wide (OpenMP and MKL), so it is set once for all
+    # workers: an op uses at most OCR_THREADS_PER_WORKER threads, and the workers running
+    # side by side stay around the core count instead of each asking for all of it
+    torch.set_num_threads(OCR_THREADS_PER_WORKER)
+    replicas = [load_models()]
+    for _ in range(1, OCR_WORKERS):
+        replicas.append(load_model_replica())
+    for worker_id, models in enumerate(replicas):
+        threading.Thread(target=ocr_worker_thread, args=(worker_id, models), daemon=True).start()
+    threading.Thread(target=report_worker_stats_thread, daemon=True).start()
+    print(f"Started {OCR_WORKERS} license plate OCR workers ({OCR_THREADS_PER_WORKER} intra-op threads each)")
+
+def start_plate_index():
+    """Open the local plate index and serve it over HTTP"""
+    global plate_index
+    plate_index = PlateIndex(PLATE_INDEX_PATH)
+    print(f"Plate index loaded: {plate_index.stats()}")
+    try:
+        serve_plate_index(plate_index, PLATE_INDEX_HOST, PLATE_INDEX_PORT)
+    except OSError as e:
+        print(f"Could not serve plate index on {PLATE_INDEX_HOST}:{PLATE_INDEX_PORT}: {e}")
 
 def maintain_connection():
     """Thread to manage Socket.IO connection and auto-reconnect"""
@@ -574,10 +1470,11 @@ def main():
         connection_thread.start()
         print("Connection management thread started")
         
-        # Start processing thread
-        processing_thread = threading.Thread(target=process_license_plates_thread, daemon=True)
-        processing_thread.start()
-        print("License plate processing thread started")
+        # Start OCR workers
+        start_ocr_workers()
+
+        if ENABLE_PLATE_INDEX:
+            start_plate_index()
         
         # Keep the main thread running
         while running:
@@ -593,6 +1490,8 @@ def main():
         running = False
         if sio.connected:
             sio.disconnect()
+        if plate_index is not None:
+            plate_index.close()
         print("License plate OCR service stopped")
 
 if __name__ == "__main__":
@@ -0,0 +1,295 @@
+import os
+import time
+import argparse
+import threading
+import cv2
+import numpy as np
+import socketio
+from werkzeug.serving import make_server
+
+from session_recorder import SessionReader
+from session_replay import summarize_latencies, format_latency_summary
+
+# ---------------------------------------------------------------------------- #
+#                          Load generator configuration                        #
+# ---------------------------------------------------------------------------- #
+HOST = '0.0.0.0'
+PORT = 3000
+DEFAULT_FPS = 10
+DEFAULT_WIDTH = 1280
+DEFAULT_HEIGHT = 720
+DEFAULT_DURATION = 30.0
+JPEG_QUALITY = 85
+TRACK_LINE_Y = 50  # Percentage of the image height, same default as the camera model
+SYNTHETIC_POOL_SIZE = 30  # Pre-encoded frames per camera so encoding never limits the send rate
+RESPONSE_EVENTS = ['car_detected', 'traffic_light', 'violation_license_plate']
+MAX_PENDING_FRAMES = 5000  # Frames remembered for matching responses without created_at
+
+# Point the services' SOCKETIO_SERVER_URL at ws://<host>:<port> to use this stand-in.
+sio = socketio.Server(async_mode='threading', cors_allowed_origins='*', max_http_buffer_size=50 * 1024 * 1024)
+app = socketio.WSGIApp(sio)
+
+running = True
+stats_lock = threading.Lock()
+sent_frames = {}  # imageId -> (created_at, buffer, cameraId)
+sent_count = 0
+latencies = {event: [] for event in RESPONSE_EVENTS}
+response_counts = {event: 0 for event in RESPONSE_EVENTS}
+violation_every = 0  # Turn every Nth car_detected with detections into a violation_detect (0 = never)
+car_detected_seen = 0
+
+
+def reset_stats():
+    global sent_count, car_detected_seen
+    with stats_lock:
+        sent_frames.clear()
+        sent_count = 0
+        car_detected_seen = 0
+        for event in RESPONSE_EVENTS:
+            latencies[event] = []
+            response_counts[event] = 0
+
+
+# ---------------------------------------------------------------------------- #
+#                                Frame sources                                 #
+# ---------------------------------------------------------------------------- #
+def synthetic_frames(camera_index, width, height):
+    """Pre-encode a short loop of frames with a few boxes moving across a road-like scene"""
+    rng = np.random.default_rng(camera_index)
+    colors = rng.integers(0, 255, size=(4, 3)).tolist()
+    frames = []
+    for i in range(SYNTHETIC_POOL_SIZE):
+        frame = np.full((height, width, 3), 90, dtype=np.uint8)
+        cv2.rectangle(frame, (0, height // 3), (width, height), (60, 60, 60), -1)
+        cv2.line(frame, (0, height // 2), (width, height // 2), (255, 255, 255), 2)
+        for j, color in enumerate(colors):
+            x = int((i / SYNTHETIC_POOL_SIZE + j / len(colors)) * width) % width
+            y = height // 3 + j * height // 8
+            cv2.rectangle(frame, (x, y), (x + width // 10, y + height // 12), color, -1)
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if ok:
+            frames.append(encoded.tobytes())
+    return frames
+
+
+def recorded_frames(path, camera_index, width, height):
+    """JPEG buffers from a recorded session, re-encoded to the requested resolution"""
+    reader = SessionReader(path)
+    camera_ids = []
+    buffers = {}
+    for event, _, data in reader:
+        if event != 'image':
+            continue
+        camera_id = data.get('cameraId')
+        if camera_id not in buffers:
+            camera_ids.append(camera_id)
+            buffers[camera_id] = []
+        buffers[camera_id].append(data['buffer'])
+    reader.close()
+    if not camera_ids:
+        raise ValueError(f"No 'image' events in {path}")
+
+    # Spread synthetic cameras over the recorded ones
+    source = buffers[camera_ids[camera_index % len(camera_ids)]]
+    frames = []
+    for buffer in source:
+        frame = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            continue
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height))
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if ok:
+            frames.append(encoded.tobytes())
+    return frames
+
+
+def camera_thread(camera_id, frames, fps, width, height, stop_event):
+    """Broadcast 'image' events for one camera at a fixed rate"""
+    global sent_count
+    interval = 1.0 / fps
+    next_time = time.time()
+    i = 0
+    while running and not stop_event.is_set():
+        buffer = frames[i % len(frames)]
+        image_id = os.urandom(12).hex()
+        created_at = int(time.time() * 1000)
+        with stats_lock:
+            sent_frames[image_id] = (created_at, buffer, camera_id)
+            if len(sent_frames) > MAX_PENDING_FRAMES:
+                sent_frames.pop(next(iter(sent_frames)))
+            sent_count += 1
+
+        sio.emit('image', {
+            'cameraId': camera_id,
+            'imageId': image_id,
+            'width': width,
+            'height': height,
+            'buffer': buffer,
+            'track_line_y': TRACK_LINE_Y,
+            'created_at': created_at,
+        }, room='all_cameras')
+
+        i += 1
+        next_time += interval
+        delay = next_time - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_time = time.time()  # Behind schedule, don't burst to catch up
+
+
+# ---------------------------------------------------------------------------- #
+#                           Socket.IO event handlers                           #
+# ---------------------------------------------------------------------------- #
+@sio.event
+def connect(sid, environ):
+    print(f"Service connected: {sid}")
+
+
+@sio.event
+def disconnect(sid):
+    print(f"Service disconnected: {sid}")
+
+
+@sio.on('join_all_camera')
+def on_join_all_camera(sid, *args):
+    print(f"join_all_camera by client: {sid}")
+    sio.enter_room(sid, 'all_cameras')
+
+
+def record_response(event, data):
+    now = int(time.time() * 1000)
+    image_id = data.get('image_id', data.get('imageId'))
+    with stats_lock:
+        response_counts[event] += 1
+        created_at = data.get('created_at')
+        if created_at is None and image_id in sent_frames:
+            created_at = sent_frames[image_id][0]
+        if created_at is not None:
+            latencies[event].append(now - created_at)
+
+
+@sio.on('car_detected')
+def on_car_detected(sid, data):
+    global car_detected_seen
+    record_response('car_detected', data)
+
+    # Stand in for Node's violation check so license_plate.py gets traffic too
+    if violation_every <= 0 or not data.get('detections'):
+        return
+    with stats_lock:
+        car_detected_seen += 1
+        if car_detected_seen % violation_every != 0:
+            return
+        frame = sent_frames.get(data.get('image_id'))
+    if frame is None:
+        return
+    sio.emit('violation_detect', {
+        'camera_id': data.get('camera_id'),
+        'image_id': data.get('image_id'),
+        'violations': [{'id': d.get('id'), 'type': 'RED_LIGHT_VIOLATION'} for d in data['detections']],
+        'buffer': frame[1],
+        'detections': data['detections'],
+        'created_at': frame[0],
+    }, skip_sid=sid)
+
+
+@sio.on('traffic_light')
+def on_traffic_light(sid, data):
+    record_response('traffic_light', data)
+
+
+@sio.on('violation_license_plate')
+def on_violation_license_plate(sid, data):
+    record_response('violation_license_plate', data)
+
+
+# ---------------------------------------------------------------------------- #
+#                                 Load runs                                    #
+# ---------------------------------------------------------------------------- #
+def run_step(num_cameras, fps, width, height, duration, session=None):
+    """Run num_cameras cameras for duration seconds and return per-service stats"""
+    reset_stats()
+    stop_event = threading.Event()
+    threads = []
+    for i in range(num_cameras):
+        frames = recorded_frames(session, i, width, height) if session else synthetic_frames(i, width, height)
+        t = threading.Thread(target=camera_thread, args=(f"loadgen_{i}", frames, fps, width, height, stop_event), daemon=True)
+        threads.append(t)
+
+    start = time.time()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop_event.set()
+    for t in threads:
+        t.join(timeout=2)
+    elapsed = time.time() - start
+
+    with stats_lock:
+        result = {
+            'cameras': num_cameras,
+            'sent_rate': sent_count / elapsed,
+            'services': {
+                event: {
+                    'rate': response_counts[event] / elapsed,
+                    'latency': summarize_latencies(latencies[event]),
+                }
+                for event in RESPONSE_EVENTS
+            },
+        }
+    return result
+
+
+def print_step(result, latency_budget_ms):
+    print("=" * 60)
+    print(f"{result['cameras']} cameras, {result['sent_rate']:.1f} frames/s sent")
+    for event, stats in result['services'].items():
+        if stats['latency']['count'] == 0:
+            print(f"  {event:<24} no responses")
+            continue
+        saturated = stats['latency']['p95'] > latency_budget_ms
+        print(f"  {event:<24} {stats['rate']:.1f}/s  {format_latency_summary(stats['latency'])}"
+              f"{'  SATURATED' if saturated else ''}")
+
+
+def main():
+    global violation_every, running
+    parser = argparse.ArgumentParser(description='Local Socket.IO stand-in for the Node server with a multi-camera load generator')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cameras', type=int, nargs='+', default=[1], help='camera counts to sweep, e.g. 1 2 4 8')
+    parser.add_argument('--fps', type=float, default=DEFAULT_FPS, help='frames per second per camera')
+    parser.add_argument('--width', type=int, default=DEFAULT_WIDTH)
+    parser.add_argument('--height', type=int, default=DEFAULT_HEIGHT)
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='seconds per sweep step')
+    parser.add_argument('--session', default=None, help='use frames from a recorded session instead of synthetic ones')
+    parser.add_argument('--violation-every', type=int, default=0,
+                        help='emit violation_detect for every Nth car_detected with detections (0 = never)')
+    parser.add_argument('--warmup', type=float, default=10.0, help='seconds to wait for services to connect')
+    parser.add_argument('--latency-budget-ms', type=float, default=1000.0, help='p95 above this marks a service saturated')
+    args = parser.parse_args()
+    violation_every = args.violation_every
+
+    server = make_server(args.host, args.port, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    print(f"Socket.IO stand-in listening on ws://{args.host}:{args.port}")
+    print(f"Waiting {args.warmup:.0f}s for services to connect...")
+    time.sleep(args.warmup)
+
+    try:
+        for num_cameras in args.cameras:
+            result = run_step(num_cameras, args.fps, args.width, args.height, args.duration, args.session)
+            print_step(result, args.latency_budget_ms)
+    except KeyboardInterrupt:
+        print("Interrupted by user. Shutting down...")
+    finally:
+        running = False
+        server.shutdown()
+        print("Load generator stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import inspect
+import hashlib
+import threading
+import torch
+
+# ---------------------------------------------------------------------------- #
+#                            Registry configuration                            #
+# ---------------------------------------------------------------------------- #
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_cache')
+HASH_CHUNK_SIZE = 1024 * 1024
+# Memory-mapped weights need torch.load(mmap=...) and load_state_dict(assign=...), torch >= 2.1
+CAN_MMAP = ('mmap' in inspect.signature(torch.load).parameters and
+            'assign' in inspect.signature(torch.nn.Module.load_state_dict).parameters)
+
+
+class ModelRegistry:
+    """Process-wide models by name, loaded lazily and at most once even with concurrent callers"""
+
+    def __init__(self):
+        self.models = dict()
+        self.locks = dict()
+        self.lock = threading.Lock()
+
+    def get(self, name, loader):
+        """
+        Return the model registered under name, calling loader() to load it the first time
+        Callers arriving while it loads wait for that load instead of starting their own;
+        if loader raises, nothing is cached and the next caller retries.
+        """
+        model = self.models.get(name)
+        if model is not None:
+            return model
+        with self.lock:
+            name_lock = self.locks.setdefault(name, threading.Lock())
+        with name_lock:
+            if name not in self.models:
+                self.models[name] = loader()
+            return self.models[name]
+
+
+registry = ModelRegistry()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_path(weights_path):
+    """Cache path of the fused artifact for a weights file, named by its content hash"""
+    stem = os.path.splitext(os.path.basename(weights_path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{file_hash(weights_path)[:16]}-fused.pt")
+
+
+def build_artifact(weights_path, artifact, load_fn, module_of):
+    """Load weights the usual way, fuse Conv+BN, switch to eval and save as a plain checkpoint"""
+    loaded = load_fn(weights_path)
+    module = module_of(loaded).cpu().float()
+    if hasattr(module, 'fuse'):
+        module = module.fuse()
+    module.eval()
+    checkpoint = {'model': module, 'source': os.path.basename(weights_path)}
+    # ultralytics rebuilds the model's default args (task, imgsz, ...) from the checkpoint
+    train_args = (getattr(loaded, 'ckpt', None) or {}).get('train_args')
+    if train_args:
+        checkpoint['train_args'] = train_args
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporary = f"{artifact}.{os.getpid()}.tmp"
+    torch.save(checkpoint, temporary)
+    os.replace(temporary, artifact)  # Atomic, concurrent builders just overwrite each other
+    print(f"Cached fused model {os.path.basename(weights_path)} -> {artifact}")
+
+
+def load_shared(weights_path, load_fn, module_of):
+    """
+    Load a model from its cached fused artifact with weights backed by a memory-mapped file
+    Args:
+        weights_path: Original .pt file; the artifact is rebuilt whenever its content changes
+        load_fn: Framework loader taking a path, e.g. ultralytics.YOLO
+        module_of: Returns the torch module inside what load_fn returns
+
+    Returns:
+        What load_fn returns. On CPU its parameters are views of the artifact's file pages,
+        so every process (and replica) loading the same artifact shares one physical copy
+    """
+    if not os.path.exists(weights_path):
+        return load_fn(weights_path)  # e.g. downloaded by the framework on first use
+
+    artifact = artifact_path(weights_path)
+    try:
+        if not os.path.exists(artifact):
+            build_artifact(weights_path, artifact, load_fn, module_of)
+        model = load_fn(artifact)
+    except Exception as e:
+        print(f"Could not use cached fused model for {weights_path}: {e}. Loading it directly.")
+        return load_fn(weights_path)
+
+    module = module_of(model)
+    parameter = next(module.parameters(), None)
+    if CAN_MMAP and parameter is not None and parameter.device.type == 'cpu':
+        # The framework read the artifact into private memory; swap in tensors mapped from
+        # the file so those copies are freed and the pages come from the shared page cache
+        mapped = torch.load(artifact, map_location='cpu', mmap=True, weights_only=False)['model']
+        module.load_state_dict(mapped.state_dict(), assign=True)
+    return model
@@ -0,0 +1,172 @@
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+MAX_TIMES = 1000
+
+
+class CameraTimeline:
+    """Phase intervals of one camera as parallel lists sorted by start (ms)"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.statuses = []
+
+
+class PhaseTimeline:
+    """
+    Per-camera light phase intervals answering "what was the light at time t"
+
+    Intervals come from the phase tracker's transition and heartbeat events: a
+    transition closes the previous interval and opens a new one, a heartbeat moves
+    the open interval's end forward. Intervals of a camera don't overlap, so both
+    starts and ends stay sorted and a lookup is one bisect. Intervals that ended more
+    than retention seconds before the camera's newest frame are dropped.
+    """
+
+    def __init__(self, retention, grace):
+        self.retention_ms = retention * 1000
+        self.grace_ms = grace * 1000  # How far past its last heartbeat an interval still answers
+        self.cameras = dict()  # cameraId -> CameraTimeline
+        self.lock = threading.Lock()
+
+    def _extend(self, timeline, start, end, status):
+        """Set the end of the interval starting at start, inserting it if it is new"""
+        index = bisect_left(timeline.starts, start)
+        if index < len(timeline.starts) and timeline.starts[index] == start:
+            timeline.ends[index] = max(timeline.ends[index], end)
+            timeline.statuses[index] = status
+            return
+        timeline.starts.insert(index, start)
+        timeline.ends.insert(index, end)
+        timeline.statuses.insert(index, status)
+
+    def record(self, camera_id, status, event):
+        """
+        Apply one phase event
+        Args:
+            camera_id: Camera the event belongs to
+            status: Phase the event reports (the 'traffic_status' of the emitted event)
+            event: The 'transition' or 'heartbeat' fields returned by PhaseTracker.update()
+        """
+        with self.lock:
+            timeline = self.cameras.setdefault(camera_id, CameraTimeline())
+            if event['event'] == 'transition' and event.get('previous_interval_start') is not None:
+                self._extend(timeline, event['previous_interval_start'], event['previous_interval_end'],
+                             event['previous_status'])
+            self._extend(timeline, event['interval_start'], event['interval_end'], status)
+
+            # Retention, relative to the camera's own frame clock
+            cutoff = timeline.ends[-1] - self.retention_ms
+            expired = bisect_left(timeline.ends, cutoff)
+            if expired:
+                del timeline.starts[:expired]
+                del timeline.ends[:expired]
+                del timeline.statuses[:expired]
+
+    def _status_at(self, timeline, time):
+        index = bisect_right(timeline.starts, time) - 1
+        if index < 0 or time > timeline.ends[index] + self.grace_ms:
+            return None
+        return timeline.statuses[index]
+
+    def status_at(self, camera_id, times):
+        """
+        Phase of a camera at each of times (ms)
+        Returns:
+            One status per time, None where no interval covers it
+        """
+        with self.lock:
+            timeline = self.cameras.get(camera_id)
+            if timeline is None:
+                return [None] * len(times)
+            return [self._status_at(timeline, time) for time in times]
+
+    def intervals(self, camera_id, start, end):
+        """Intervals of a camera overlapping [start, end] (ms), oldest first"""
+        with self.lock:
+            timeline = self.cameras.get(camera_id)
+            if timeline is None:
+                return []
+            index = max(0, bisect_right(timeline.starts, start) - 1)
+            intervals = []
+            while index < len(timeline.starts) and timeline.starts[index] <= end:
+                if timeline.ends[index] >= start:
+                    intervals.append({'status': timeline.statuses[index], 'start': timeline.starts[index],
+                                      'end': timeline.ends[index]})
+                index += 1
+            return intervals
+
+    def stats(self):
+        with self.lock:
+            return {'cameras': len(self.cameras),
+                    'intervals': sum(len(timeline.starts) for timeline in self.cameras.values())}
+
+    def query(self, params):
+        """
+        Answer a query given as a dict, shared by the HTTP endpoint and Socket.IO
+        Args:
+            params: {'camera_id', 'times': [ms, ...]} for point lookups or
+                    {'camera_id', 'start', 'end'} for the intervals in a range
+        """
+        camera_id = params.get('camera_id')
+        if camera_id is None:
+            raise ValueError("Missing 'camera_id'")
+        camera_id = str(camera_id)
+        if 'times' in params:
+            times = [float(time) for time in params['times']][:MAX_TIMES]
+            return {'camera_id': camera_id, 'times': times, 'statuses': self.status_at(camera_id, times)}
+        if 'start' in params and 'end' in params:
+            return {'camera_id': camera_id, 'intervals': self.intervals(camera_id, float(params['start']),
+                                                                        float(params['end']))}
+        raise ValueError("Expected 'times' or 'start' and 'end'")
+
+
+# ---------------------------------------------------------------------------- #
+#                                 HTTP endpoint                                #
+# ---------------------------------------------------------------------------- #
+def make_handler(timeline):
+
+    class PhaseTimelineHandler(BaseHTTPRequestHandler):
+        """GET /phases/at?camera_id=&t=ms[,ms...], GET /phases/range?camera_id=&start=&end= and GET /phases/stats"""
+
+        def _send(self, status, body):
+            content = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == '/phases/stats':
+                return self._send(200, timeline.stats())
+            if url.path == '/phases/at':
+                params['times'] = params.pop('t', '').split(',') if params.get('t') else []
+            elif url.path == '/phases/range':
+                params.pop('times', None)
+            else:
+                return self._send(404, {'error': f"Unknown path {url.path}"})
+            try:
+                self._send(200, timeline.query(params))
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass  # Keep the service log for detections
+
+    return PhaseTimelineHandler
+
+
+def serve(timeline, host, port):
+    """Serve the timeline over HTTP from a daemon thread, returns the server"""
+    server = ThreadingHTTPServer((host, port), make_handler(timeline))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Phase timeline serving on http://{host}:{port}/phases/")
+    return server
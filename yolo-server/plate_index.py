@@ -0,0 +1,227 @@
+import os
+import re
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+
+def normalize_plate(text):
+    """Uppercase and drop separators, so '51d-123.45' and '51D12345' index the same"""
+    return re.sub(r'[^0-9A-Z]', '', str(text).upper())
+
+
+def deletion_keys(plate):
+    """The plate and every string one deletion away from it"""
+    return {plate} | {plate[:i] + plate[i + 1:] for i in range(len(plate))}
+
+
+def within_one_edit(a, b):
+    """Levenshtein distance <= 1 (one substitution, insertion or deletion)"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+class PlateIndex:
+    """
+    Append-only index of recognized plates with exact, prefix and one-edit lookups
+
+    Records (camera_id, time, track_id, plate, confidence) are appended as JSON lines
+    to path and replayed into memory on startup. A character trie answers prefix
+    queries; a deletion-neighbourhood map (every plate under itself and each of its
+    one-character deletions) answers misread-plate queries without scanning.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        self.by_plate = dict()  # plate -> record ids, oldest first
+        self.trie = dict()  # char -> child node, None -> True where a plate ends
+        self.neighbors = dict()  # deletion key -> set of plates
+        self.last_by_track = dict()  # (camera_id, track_id) -> last indexed plate
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        torn = False
+        if os.path.exists(path):
+            self._load()
+            with open(path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b'\n'
+        self.file = open(path, 'a', encoding='utf-8')
+        if torn:
+            self.file.write('\n')  # Don't append the next record to a torn last line
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from a crash
+                self._insert(record)
+
+    def _insert(self, record):
+        plate = record['plate']
+        record_id = len(self.records)
+        self.records.append(record)
+        self.last_by_track[(record['camera_id'], record['track_id'])] = plate
+
+        if plate in self.by_plate:
+            self.by_plate[plate].append(record_id)
+            return
+        self.by_plate[plate] = [record_id]
+        node = self.trie
+        for char in plate:
+            node = node.setdefault(char, dict())
+        node[None] = True
+        for key in deletion_keys(plate):
+            self.neighbors.setdefault(key, set()).add(plate)
+
+    def add(self, camera_id, track_id, plate, confidence=None, timestamp=None):
+        """
+        Append a reading; a track reported again with the same plate is not re-indexed
+        Returns:
+            True if a record was appended
+        """
+        plate = normalize_plate(plate)
+        if not plate:
+            return False
+        record = {
+            'camera_id': camera_id,
+            'time': time.time() if timestamp is None else timestamp,
+            'track_id': track_id,
+            'plate': plate,
+            'confidence': confidence,
+        }
+        with self.lock:
+            if track_id is not None and self.last_by_track.get((camera_id, track_id)) == plate:
+                return False
+            self.file.write(json.dumps(record) + '\n')
+            self.file.flush()
+            self._insert(record)
+        return True
+
+    def _records_for(self, plates, camera_id=None, since=None, until=None, limit=DEFAULT_LIMIT):
+        """Matching records of the given plates, newest first"""
+        records = []
+        for plate in plates:
+            for record_id in self.by_plate.get(plate, ()):
+                record = self.records[record_id]
+                if camera_id is not None and str(record['camera_id']) != str(camera_id):
+                    continue
+                if since is not None and record['time'] < since:
+                    continue
+                if until is not None and record['time'] > until:
+                    continue
+                records.append(record)
+        records.sort(key=lambda r: r['time'], reverse=True)
+        return records[:limit]
+
+    def exact(self, plate, **filters):
+        with self.lock:
+            return self._records_for([normalize_plate(plate)], **filters)
+
+    def prefix(self, prefix, **filters):
+        prefix = normalize_plate(prefix)
+        with self.lock:
+            node = self.trie
+            for char in prefix:
+                node = node.get(char)
+                if node is None:
+                    return []
+            plates = []
+            stack = [(node, prefix)]
+            while stack:
+                node, text = stack.pop()
+                for char, child in node.items():
+                    if char is None:
+                        plates.append(text)
+                    else:
+                        stack.append((child, text + char))
+            return self._records_for(plates, **filters)
+
+    def similar(self, plate, **filters):
+        """Records of plates within one edit of plate, e.g. a misread character"""
+        plate = normalize_plate(plate)
+        with self.lock:
+            candidates = set()
+            for key in deletion_keys(plate):
+                candidates |= self.neighbors.get(key, set())
+            plates = [candidate for candidate in candidates if within_one_edit(plate, candidate)]
+            return self._records_for(plates, **filters)
+
+    def stats(self):
+        with self.lock:
+            return {'records': len(self.records), 'plates': len(self.by_plate), 'neighbor_keys': len(self.neighbors)}
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+# ---------------------------------------------------------------------------- #
+#                                 HTTP endpoint                                #
+# ---------------------------------------------------------------------------- #
+def make_handler(index):
+    queries = {'/plates/exact': index.exact, '/plates/prefix': index.prefix, '/plates/similar': index.similar}
+
+    class PlateIndexHandler(BaseHTTPRequestHandler):
+        """GET /plates/{exact,prefix,similar}?q=...&camera_id=&since=&until=&limit= and GET /plates/stats"""
+
+        def _send(self, status, body):
+            content = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == '/plates/stats':
+                return self._send(200, index.stats())
+            if url.path not in queries:
+                return self._send(404, {'error': f"Unknown path {url.path}"})
+            if not params.get('q'):
+                return self._send(400, {'error': "Missing query parameter 'q'"})
+            try:
+                filters = {
+                    'camera_id': params.get('camera_id'),
+                    'since': float(params['since']) if 'since' in params else None,
+                    'until': float(params['until']) if 'until' in params else None,
+                    'limit': min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT),
+                }
+            except ValueError as e:
+                return self._send(400, {'error': str(e)})
+            records = queries[url.path](params['q'], **filters)
+            self._send(200, {'query': params['q'], 'count': len(records), 'records': records})
+
+        def log_message(self, format, *args):
+            pass  # Keep the service log for OCR output
+
+    return PlateIndexHandler
+
+
+def serve(index, host, port):
+    """Serve the index over HTTP from a daemon thread, returns the server"""
+    server = ThreadingHTTPServer((host, port), make_handler(index))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Plate index serving {index.path} on http://{host}:{port}/plates/")
+    return server
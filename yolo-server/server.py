@@ -5,6 +5,7 @@ import threading
 import socketio
 import base64
 from ultralytics import YOLO
+from model_registry import registry as model_registry, load_shared
 import io
 from PIL import Image
 import queue
@@ -352,7 +353,8 @@ def load_model():
 
         # Load the model with the selected device
         print(f"Loading model on device: {device}")
-        model = YOLO(MODEL_PATH)
+        # Fused artifact with memory-mapped weights, shared by every process on this host
+        model = model_registry.get(MODEL_PATH, lambda: load_shared(MODEL_PATH, YOLO, lambda m: m.model))
         model.to(device)
         print(f"Model loaded successfully! Running on: {device}")
         print(f"Available classes: {model.names}")
@@ -0,0 +1,212 @@
+import os
+import io
+import json
+import time
+import base64
+import struct
+import argparse
+import threading
+import socketio
+
+# ---------------------------------------------------------------------------- #
+#                            Recorder configuration                            #
+# ---------------------------------------------------------------------------- #
+SOCKETIO_SERVER_URL = 'wss://localhost:3000'
+SESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions')
+DEFAULT_SESSION_PATH = os.path.join(SESSION_DIR, 'session.rec')
+RECORDED_EVENTS = ['image', 'violation_detect']
+
+# ---------------------------------------------------------------------------- #
+#                                 File format                                  #
+# ---------------------------------------------------------------------------- #
+# Data file:  MAGIC, then records of <meta_len:u32><payload_len:u32><meta json><payload>
+# Index file: one <offset:u64><received_at:f64> entry per record, written after
+#             the record itself so a crash can only leave an unindexed tail.
+MAGIC = b'TMREC001'
+RECORD_HEADER = struct.Struct('<II')
+INDEX_ENTRY = struct.Struct('<Qd')
+
+
+def index_path_for(path):
+    return path + '.idx'
+
+
+def buffer_to_bytes(buffer):
+    """Normalize an event buffer (bytes, base64 string or {'image': ...}) to raw bytes"""
+    if isinstance(buffer, dict) and 'image' in buffer:
+        buffer = buffer['image']
+    if isinstance(buffer, str):
+        return base64.b64decode(buffer)
+    if buffer is None:
+        return b''
+    return bytes(buffer)
+
+
+class SessionWriter:
+    """Append-only writer for recorded Socket.IO events"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.data_file = open(path, 'ab')
+        self.index_file = open(index_path_for(path), 'ab')
+        if is_new:
+            self.data_file.write(MAGIC)
+            self.data_file.flush()
+        self.count = 0
+
+    def append(self, event, data, received_at=None):
+        """
+        Append one event to the session
+        Args:
+            event: Socket.IO event name ('image', 'violation_detect', ...)
+            data: Event payload; its 'buffer' field is stored as raw bytes
+            received_at: Wall-clock receive time in seconds (defaults to now)
+        """
+        if received_at is None:
+            received_at = time.time()
+
+        payload = buffer_to_bytes(data.get('buffer'))
+        fields = {key: value for key, value in data.items() if key != 'buffer'}
+        meta = json.dumps({
+            'event': event,
+            'received_at': received_at,
+            'data': fields,
+        }).encode('utf-8')
+
+        with self.lock:
+            offset = self.data_file.tell()
+            self.data_file.write(RECORD_HEADER.pack(len(meta), len(payload)))
+            self.data_file.write(meta)
+            self.data_file.write(payload)
+            self.data_file.flush()
+            self.index_file.write(INDEX_ENTRY.pack(offset, received_at))
+            self.index_file.flush()
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.data_file.close()
+            self.index_file.close()
+
+
+class SessionReader:
+    """Random-access reader for a recorded session"""
+
+    def __init__(self, path):
+        self.path = path
+        self.data_file = open(path, 'rb')
+        if self.data_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a session recording: {path}")
+
+        index_path = index_path_for(path)
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % INDEX_ENTRY.size
+            self.index = [entry for entry in INDEX_ENTRY.iter_unpack(raw[:usable])]
+        else:
+            print(f"Index not found for {path}, rebuilding by scanning records...")
+            self.index = self._scan()
+
+    def _scan(self):
+        index = []
+        self.data_file.seek(len(MAGIC))
+        while True:
+            offset = self.data_file.tell()
+            header = self.data_file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            meta_len, payload_len = RECORD_HEADER.unpack(header)
+            meta = self.data_file.read(meta_len)
+            if len(meta) < meta_len:
+                break
+            received_at = json.loads(meta.decode('utf-8'))['received_at']
+            self.data_file.seek(payload_len, io.SEEK_CUR)
+            index.append((offset, received_at))
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        """
+        Read one record
+        Returns:
+            (event, received_at, data) where data['buffer'] holds the raw bytes
+        """
+        offset, received_at = self.index[i]
+        self.data_file.seek(offset)
+        meta_len, payload_len = RECORD_HEADER.unpack(self.data_file.read(RECORD_HEADER.size))
+        meta = json.loads(self.data_file.read(meta_len).decode('utf-8'))
+        data = meta['data']
+        data['buffer'] = self.data_file.read(payload_len)
+        return meta['event'], received_at, data
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        self.data_file.close()
+
+
+# ---------------------------------------------------------------------------- #
+#                              Recording client                                #
+# ---------------------------------------------------------------------------- #
+def record(server_url, path, events=RECORDED_EVENTS):
+    """Connect to the Node server like the detection services do and record every event"""
+    writer = SessionWriter(path)
+    sio = socketio.Client(reconnection=True, reconnection_attempts=0, reconnection_delay=1, reconnection_delay_max=5, ssl_verify=False)
+
+    @sio.event
+    def connect():
+        print(f"Successfully connected to Socket.IO server: {server_url}")
+        sio.emit("join_all_camera")
+
+    @sio.event
+    def disconnect():
+        print("Disconnected from Socket.IO server")
+
+    def make_handler(event):
+        def handler(data):
+            try:
+                writer.append(event, data)
+                if writer.count % 100 == 0:
+                    print(f"Recorded {writer.count} events to {path}")
+            except Exception as e:
+                print(f"Error recording '{event}' event: {e}")
+        return handler
+
+    for event in events:
+        sio.on(event, make_handler(event))
+
+    print(f"Recording {events} events from {server_url} into {path}")
+    try:
+        sio.connect(server_url, transports=['websocket'])
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Interrupted by user. Stopping recorder...")
+    finally:
+        if sio.connected:
+            sio.disconnect()
+        writer.close()
+        print(f"Recorder stopped. {writer.count} events written to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record camera events from the Node server to an indexed session file')
+    parser.add_argument('--url', default=SOCKETIO_SERVER_URL, help='Socket.IO server URL')
+    parser.add_argument('--out', default=DEFAULT_SESSION_PATH, help='session file to append to')
+    parser.add_argument('--events', nargs='+', default=RECORDED_EVENTS, help='event names to record')
+    args = parser.parse_args()
+    record(args.url, args.out, args.events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import os
+import sys
+import math
+import time
+import argparse
+import threading
+import importlib.util
+
+from session_recorder import SessionReader, DEFAULT_SESSION_PATH
+
+# ---------------------------------------------------------------------------- #
+#                               Replay targets                                 #
+# ---------------------------------------------------------------------------- #
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# How to drive each service: which file, which Socket.IO handler consumes which
+# recorded event, how to load its models, which worker threads main() would
+# normally start, and which fields of its responses identify the source frame.
+SERVICES = {
+    'server': {
+        'file': 'server.py',
+        'event': 'image',
+        'handler': 'on_image',
+        'load': 'load_model',
+        'threads': [],
+        'outputs': ['car_detected'],
+        'id_field': 'image_id',
+    },
+    'traffic-light': {
+        'file': 'traffic-light.py',
+        'event': 'image',
+        'handler': 'on_image',
+        'load': 'load_model',
+        'threads': ['process_frames_thread'],
+        'outputs': ['traffic_light'],
+        'id_field': 'imageId',
+    },
+    'license_plate': {
+        'file': 'license_plate.py',
+        'event': 'violation_detect',
+        'handler': 'on_license_plate',
+        'load': 'start_ocr_workers',
+        'threads': [],
+        'outputs': ['violation_license_plate'],
+        'id_field': 'image_id',
+    },
+}
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize_latencies(latencies_ms):
+    """Mean, max and PERCENTILES of a list of latencies in milliseconds"""
+    values = sorted(latencies_ms)
+    summary = {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else 0.0,
+        'max': values[-1] if values else 0.0,
+    }
+    for p in PERCENTILES:
+        summary[f'p{p}'] = percentile(values, p)
+    return summary
+
+
+def format_latency_summary(summary):
+    parts = [f"p{p}={summary[f'p{p}']:.1f}ms" for p in PERCENTILES]
+    return f"n={summary['count']} mean={summary['mean']:.1f}ms " + " ".join(parts) + f" max={summary['max']:.1f}ms"
+
+
+def load_service(name):
+    """Import a service script by file path (traffic-light.py is not a valid module name)"""
+    spec = SERVICES[name]
+    path = os.path.join(SERVICE_DIR, spec['file'])
+    if SERVICE_DIR not in sys.path:
+        sys.path.insert(0, SERVICE_DIR)
+    module_spec = importlib.util.spec_from_file_location(f"replay_{name.replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    return module
+
+
+def image_to_violation(data):
+    """Synthesize a 'violation_detect' payload covering the whole frame from an 'image' event"""
+    return {
+        'camera_id': data.get('cameraId'),
+        'image_id': data.get('imageId'),
+        'violations': [],
+        'buffer': data.get('buffer'),
+        'detections': [{
+            'id': None,
+            'class': 'car',
+            'confidence': 1.0,
+            'bbox': {'x1': 0.0, 'y1': 0.0, 'x2': 1.0, 'y2': 1.0, 'width': 1.0, 'height': 1.0},
+        }],
+        'created_at': data.get('created_at'),
+    }
+
+
+class ResponseCollector:
+    """Replaces a service's sio.emit and matches responses to submitted frames"""
+
+    def __init__(self, outputs, id_field):
+        self.outputs = outputs
+        self.id_field = id_field
+        self.lock = threading.Lock()
+        self.submitted_at = {}
+        self.latencies_ms = []
+        self.counts = {event: 0 for event in outputs}
+        self.first_submit = None
+        self.last_emit = None
+
+    def submit(self, frame_id):
+        now = time.time()
+        with self.lock:
+            self.submitted_at[frame_id] = now
+            if self.first_submit is None:
+                self.first_submit = now
+
+    def emit(self, event, data=None, *args, **kwargs):
+        now = time.time()
+        if event not in self.counts:
+            return
+        with self.lock:
+            self.counts[event] += 1
+            self.last_emit = now
+            submitted = self.submitted_at.pop((data or {}).get(self.id_field), None)
+            if submitted is not None:
+                self.latencies_ms.append((now - submitted) * 1000)
+
+
+def replay(service_name, path, speed=1.0, limit=None, drain=5.0, synthesize_violations=False):
+    """
+    Replay a recorded session through one service's Socket.IO handler
+    Args:
+        service_name: Key of SERVICES
+        path: Session file written by session_recorder.py
+        speed: 1.0 = original timing, N = N× faster, 0 = as fast as possible
+        limit: Maximum number of events to replay
+        drain: Seconds to wait for outstanding responses after the last event
+        synthesize_violations: Feed 'image' events to license_plate as whole-frame violations
+    """
+    spec = SERVICES[service_name]
+    reader = SessionReader(path)
+    service = load_service(service_name)
+
+    collector = ResponseCollector(spec['outputs'], spec['id_field'])
+    service.sio.emit = collector.emit
+
+    if getattr(service, spec['load'])() is False:
+        print(f"Failed to load models for {service_name}. Exiting...")
+        return None
+    for thread_name in spec['threads']:
+        threading.Thread(target=getattr(service, thread_name), daemon=True).start()
+    handler = getattr(service, spec['handler'])
+
+    accepted_events = {spec['event']}
+    if synthesize_violations:
+        accepted_events.add('image')
+
+    print(f"Replaying {len(reader)} recorded events from {path} into {spec['file']} "
+          f"at {'max' if speed <= 0 else f'{speed}x'} speed")
+
+    submitted = 0
+    replay_start = time.time()
+    first_received_at = None
+    for event, received_at, data in reader:
+        if event not in accepted_events:
+            continue
+        if limit is not None and submitted >= limit:
+            break
+
+        # Keep the original inter-arrival gaps, compressed by the speed factor
+        if first_received_at is None:
+            first_received_at = received_at
+        if speed > 0:
+            delay = (received_at - first_received_at) / speed - (time.time() - replay_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        if event == 'image' and spec['event'] == 'violation_detect':
+            data = image_to_violation(data)
+        # Frames are re-stamped so downstream age checks see them as fresh
+        if 'created_at' in data:
+            data['created_at'] = int(time.time() * 1000)
+
+        collector.submit(data.get('imageId', data.get('image_id')))
+        handler(data)
+        submitted += 1
+
+    deadline = time.time() + drain
+    while time.time() < deadline and collector.submitted_at:
+        time.sleep(0.05)
+    service.running = False
+    reader.close()
+
+    elapsed = (collector.last_emit or time.time()) - (collector.first_submit or replay_start)
+    emitted = sum(collector.counts.values())
+    summary = summarize_latencies(collector.latencies_ms)
+
+    print("=" * 60)
+    print(f"Service:    {service_name}")
+    print(f"Submitted:  {submitted} events")
+    print(f"Emitted:    {collector.counts}")
+    print(f"Throughput: {submitted / elapsed if elapsed > 0 else 0:.2f} events/s in, "
+          f"{emitted / elapsed if elapsed > 0 else 0:.2f} responses/s out")
+    print(f"Latency:    {format_latency_summary(summary)}")
+    print("=" * 60)
+
+    return {
+        'service': service_name,
+        'submitted': submitted,
+        'emitted': collector.counts,
+        'elapsed': elapsed,
+        'latency': summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded camera session through a detection service')
+    parser.add_argument('service', choices=sorted(SERVICES), help='service to drive')
+    parser.add_argument('--session', default=DEFAULT_SESSION_PATH, help='session file to replay')
+    parser.add_argument('--speed', type=float, default=1.0, help='1 = original timing, N = N× faster, 0 = as fast as possible')
+    parser.add_argument('--limit', type=int, default=None, help='maximum number of events to replay')
+    parser.add_argument('--drain', type=float, default=5.0, help='seconds to wait for outstanding responses')
+    parser.add_argument('--synthesize-violations', action='store_true',
+                        help='feed image events to license_plate as whole-frame violations')
+    args = parser.parse_args()
+    replay(args.service, args.session, args.speed, args.limit, args.drain, args.synthesize_violations)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,12 @@ import socketio
 import base64
 import time
 import threading
+import statistics
 from ultralytics import YOLO
-import queue
+from model_registry import registry as model_registry, load_shared
+from phase_timeline import PhaseTimeline, serve as serve_phase_timeline
 import io
+from collections import deque
 from PIL import Image
 
 # ---------------------------------------------------------------------------- #
@@ -18,6 +21,67 @@ CONFIDENCE_THRESHOLD = 0.4
 SOCKETIO_SERVER_URL = 'wss://localhost:3000'
 ENABLE_GPU = True
 
+# ---------------------------------------------------------------------------- #
+#                               ROI lock configuration                         #
+# ---------------------------------------------------------------------------- #
+# Signal heads don't move: once the detector has found them confidently, later frames
+# only classify those regions by color and the detector runs again periodically
+ENABLE_ROI_LOCK = True
+ROI_LOCK_CONFIDENCE = 0.6  # Detections at least this confident pin an ROI
+ROI_PADDING = 0.1  # Fraction of the box added on each side to absorb camera jitter
+ROI_REDETECT_INTERVAL = 10.0  # Seconds before a full detection refreshes the ROIs
+ROI_MIN_CONFIDENCE = 0.5  # Color confidence below this drops the lock and re-detects
+# Lit-lamp test on OpenCV HSV (H 0-179): bright, saturated pixels vote by hue
+LIT_MIN_SATURATION = 90
+LIT_MIN_VALUE = 170
+LIT_MIN_FRACTION = 0.02  # Lit pixels per ROI pixel below which no lamp is considered on
+LAMP_HUES = {
+    'red': [(0, 10), (160, 179)],
+    'yellow': [(15, 35)],
+    'green': [(40, 95)],
+}
+# Detector class for each lamp color (see TrafficLightEnum in the Node server)
+LAMP_CLASSES = {
+    'red': 'Traffic Light -Red-',
+    'yellow': 'Traffic Light -Yellow-',
+    'green': 'Traffic Light -Green-',
+}
+
+# ---------------------------------------------------------------------------- #
+#                          Phase tracking configuration                        #
+# ---------------------------------------------------------------------------- #
+# Emit a 'traffic_light' event only when a camera's phase changes, plus heartbeats
+# that extend the current phase's interval, instead of one event per frame
+ENABLE_PHASE_TRACKING = True
+PHASE_CONFIRM_FRAMES = 3  # Consecutive frames a new status needs before it becomes the phase
+PHASE_HEARTBEAT_INTERVAL = 5.0  # Seconds of frame time between heartbeats of an unchanged phase
+# Phase intervals kept in memory for "what was the light at time t" lookups, served
+# over HTTP (/phases/...) and the 'traffic_light_phase' Socket.IO request
+ENABLE_PHASE_TIMELINE = True
+PHASE_TIMELINE_RETENTION = 900.0  # Seconds of history kept per camera
+PHASE_TIMELINE_GRACE = 2 * PHASE_HEARTBEAT_INTERVAL  # An open interval answers this long past its last heartbeat
+PHASE_TIMELINE_HOST = '127.0.0.1'
+PHASE_TIMELINE_PORT = 8766
+# Fixed-time signals repeat their cycle: once a phase's duration has been seen to be
+# stable, frames are only sampled sparsely until shortly before the phase should end
+ENABLE_CYCLE_PREDICTION = True
+CYCLE_HISTORY = 6  # Durations kept per phase
+CYCLE_MIN_SAMPLES = 3  # Durations of a phase needed before it is predicted
+CYCLE_TOLERANCE = 0.1  # Allowed deviation from the expected duration, as a fraction of it...
+CYCLE_TOLERANCE_MIN = 1.0  # ...but at least this many seconds
+CYCLE_GUARD = 3.0  # Seconds before the predicted end (beyond tolerance) to resume full rate
+CYCLE_IDLE_INTERVAL = PHASE_HEARTBEAT_INTERVAL  # Seconds between frames sampled mid-phase
+
+# ---------------------------------------------------------------------------- #
+#                            Scheduling configuration                          #
+# ---------------------------------------------------------------------------- #
+# Each camera is admitted at its own rate into its own mailbox; the processing thread
+# takes frames round-robin across cameras and runs the detector on them as one batch
+CAMERA_TARGET_FPS = 5.0  # Admitted frames per second per camera
+MAILBOX_SIZE = 1  # Frames kept per camera, a newer frame replaces the oldest one
+MAX_BATCH_SIZE = 8  # Frames (from different cameras) per detector forward
+MAX_FRAME_AGE = 2.0  # Seconds a frame may wait in its mailbox before it is dropped as stale
+
 # ---------------------------------------------------------------------------- #
 #                         Socketio client configuration                        #
 # ---------------------------------------------------------------------------- #
@@ -30,15 +94,353 @@ print(f"Initializing Socket.IO client to connect to {SOCKETIO_SERVER_URL}")
 running = True
 connected = False
 model = None
-last_frame_time = 0
-MAX_FPS = 30
+last_frame_times = dict()  # cameraId -> time of the last admitted frame
+roi_locks = dict()  # cameraId -> pinned signal-head ROIs, see lock_rois()
+roi_stats = {'roi_frames': 0, 'detector_frames': 0, 'locks': 0, 'unlocks': 0}
+phase_trackers = dict()  # cameraId -> PhaseTracker
+phase_timeline = PhaseTimeline(PHASE_TIMELINE_RETENTION, PHASE_TIMELINE_GRACE)
+signal_cycles = dict()  # cameraId -> SignalCycle
+
+class SignalCycle:
+    """
+    Learned phase durations of one camera, deciding which frames are worth inferring
+
+    Durations come from the phase tracker's transitions (ms of frame time). A phase is
+    predicted once its last CYCLE_MIN_SAMPLES+ durations agree within tolerance; a phase
+    ending outside its tolerance is a mismatch and forgets that phase's history, so the
+    camera runs at full rate until the cycle is learned again.
+    """
 
-# Queue for model processing
-model_frame_queue = queue.Queue(maxsize=10)
+    def __init__(self):
+        self.durations = dict()  # phase -> deque of durations (ms)
+        self.opened_at = None  # Start of the current phase if a transition opened it (so its duration is complete)
+        self.last_sample = None
+        self.mismatches = 0
+
+    @staticmethod
+    def tolerance(expected):
+        return max(CYCLE_TOLERANCE_MIN * 1000, CYCLE_TOLERANCE * expected)
+
+    def expected(self, phase):
+        """Expected duration of phase (ms), or None while it isn't predictable"""
+        durations = self.durations.get(phase)
+        if not durations or len(durations) < CYCLE_MIN_SAMPLES:
+            return None
+        expected = statistics.median(durations)
+        if max(durations) - min(durations) > self.tolerance(expected):
+            return None
+        return expected
+
+    def observe(self, transition):
+        """Learn from a 'transition' event of PhaseTracker.update()"""
+        previous = transition['previous_status']
+        if previous is not None and transition['previous_interval_start'] == self.opened_at:
+            duration = transition['interval_start'] - transition['previous_interval_start']
+            expected = self.expected(previous)
+            durations = self.durations.setdefault(previous, deque(maxlen=CYCLE_HISTORY))
+            if expected is not None and abs(duration - expected) > self.tolerance(expected):
+                self.mismatches += 1
+                durations.clear()
+                print(f"Signal cycle mismatch: {previous} lasted {duration / 1000:.1f}s, "
+                      f"expected {expected / 1000:.1f}s. Back to full rate")
+            durations.append(duration)
+        self.opened_at = transition['interval_start'] if previous is not None else None
+
+    def should_sample(self, tracker, created_at):
+        """Whether a frame at created_at (ms) should be inferred"""
+        sample = True
+        if tracker is not None and tracker.phase is not None and tracker.candidate is None:
+            expected = self.expected(tracker.phase)
+            if expected is not None:
+                remaining = tracker.phase_start + expected - created_at
+                if remaining > CYCLE_GUARD * 1000 + self.tolerance(expected):
+                    sample = self.last_sample is None or created_at - self.last_sample >= CYCLE_IDLE_INTERVAL * 1000
+        if sample:
+            self.last_sample = created_at
+        return sample
+
+class FrameScheduler:
+    """
+    Per-camera mailboxes served round-robin
+
+    A busy camera only ever holds MAILBOX_SIZE frames and gets one slot per round, so it
+    cannot starve the others; with MAILBOX_SIZE = 1 every camera's next result comes from
+    its newest frame, at most one round behind.
+    """
+
+    def __init__(self, mailbox_size, max_age):
+        self.mailbox_size = mailbox_size
+        self.max_age = max_age
+        self.mailboxes = dict()  # cameraId -> deque of (enqueued_at, item)
+        self.ready = deque()  # cameraIds with frames, in service order
+        self.condition = threading.Condition()
+        self.stats = dict()  # cameraId -> counters
+
+    def camera_stats(self, cameraId):
+        return self.stats.setdefault(cameraId, {'admitted': 0, 'throttled': 0, 'predicted': 0, 'replaced': 0,
+                                                 'stale': 0, 'processed': 0})
+
+    def put(self, cameraId, item):
+        with self.condition:
+            mailbox = self.mailboxes.setdefault(cameraId, deque())
+            if len(mailbox) >= self.mailbox_size:
+                mailbox.popleft()
+                self.camera_stats(cameraId)['replaced'] += 1
+            mailbox.append((time.time(), item))
+            self.camera_stats(cameraId)['admitted'] += 1
+            if cameraId not in self.ready:
+                self.ready.append(cameraId)
+            self.condition.notify()
+
+    def get_batch(self, max_size, timeout):
+        """
+        Up to max_size frames taken round-robin, one per camera per round
+        Returns:
+            List of items, empty if nothing arrived within timeout
+        """
+        batch = []
+        with self.condition:
+            if not self.ready:
+                self.condition.wait(timeout)
+            now = time.time()
+            while self.ready and len(batch) < max_size:
+                cameraId = self.ready.popleft()
+                mailbox = self.mailboxes[cameraId]
+                enqueued_at, item = mailbox.popleft()
+                if mailbox:
+                    self.ready.append(cameraId)  # Back of the line for its next frame
+                if now - enqueued_at > self.max_age:
+                    self.camera_stats(cameraId)['stale'] += 1
+                    continue
+                self.camera_stats(cameraId)['processed'] += 1
+                batch.append(item)
+        return batch
+
+
+# Frames waiting for the model, per camera
+frame_scheduler = FrameScheduler(MAILBOX_SIZE, MAX_FRAME_AGE)
+
+class PhaseTracker:
+    """
+    Debounced light phase of one camera
+
+    A status becomes the phase only after PHASE_CONFIRM_FRAMES consecutive frames agree,
+    so single-frame flicker never reaches the server. Frame times are the frames'
+    created_at (ms), and every event carries the interval the phase has covered so far.
+    """
+
+    def __init__(self):
+        self.phase = None
+        self.phase_start = None  # created_at of the first frame of the phase
+        self.last_seen = None  # created_at of the latest frame agreeing with the phase
+        self.last_emit = None
+        self.candidate = None
+        self.candidate_count = 0
+        self.candidate_start = None
+
+    def update(self, status, created_at):
+        """
+        Feed one frame's status
+        Returns:
+            Fields to add to the 'traffic_light' event on a transition or heartbeat, else None
+        """
+        if status == self.phase:
+            self.candidate = None
+            self.candidate_count = 0
+            self.last_seen = created_at
+            if (created_at - self.last_emit) / 1000.0 < PHASE_HEARTBEAT_INTERVAL:
+                return None
+            self.last_emit = created_at
+            return {'event': 'heartbeat', 'interval_start': self.phase_start, 'interval_end': created_at}
+
+        if status != self.candidate:
+            self.candidate = status
+            self.candidate_count = 0
+            self.candidate_start = created_at
+        self.candidate_count += 1
+        if self.candidate_count < PHASE_CONFIRM_FRAMES:
+            return None
+
+        transition = {
+            'event': 'transition',
+            'previous_status': self.phase,
+            'previous_interval_start': self.phase_start,
+            'previous_interval_end': self.last_seen,
+            'interval_start': self.candidate_start,
+            'interval_end': created_at,
+        }
+        self.phase = status
+        self.phase_start = self.candidate_start
+        self.last_seen = created_at
+        self.last_emit = created_at
+        self.candidate = None
+        self.candidate_count = 0
+        return transition
 
 def get_model_path():
     return MODEL_PATH
 
+def detect_traffic_lights(frames):
+    """
+    Run the full detector on a batch of frames in one forward
+    Returns:
+        Detections above CONFIDENCE_THRESHOLD for each frame, and the batch inference time (ms)
+    """
+    start_time = time.time()
+    results = model(frames, verbose=False)
+    inference_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+
+    batch_signs = []
+    for frame, result in zip(frames, results):
+        height, width = frame.shape[:2]
+        detected_signs = []
+        boxes = result.boxes
+        for box in boxes:
+            confidence = float(box.conf[0])
+            cls_id = int(box.cls[0])
+
+            # Check if the detected object meets confidence threshold
+            if confidence >= CONFIDENCE_THRESHOLD:
+                # Get bounding box coordinates
+                x1, y1, x2, y2 = map(int, box.xyxy[0])
+
+                class_name = model.names[cls_id]
+
+                # Calculate relative coordinates (0-1 range)
+                rel_x1 = x1 / width
+                rel_y1 = y1 / height
+                rel_x2 = x2 / width
+                rel_y2 = y2 / height
+
+                # Add detection to results
+                detection_info = {
+                    'class': class_name,
+                    'confidence': float(confidence),
+                    'bbox': {
+                        'x1': float(rel_x1),  # Normalized coordinates (0-1)
+                        'y1': float(rel_y1),
+                        'x2': float(rel_x2),
+                        'y2': float(rel_y2),
+                        'width': float(rel_x2 - rel_x1),
+                        'height': float(rel_y2 - rel_y1)
+                    }
+                }
+
+                detected_signs.append(detection_info)
+        batch_signs.append(detected_signs)
+
+    return batch_signs, inference_time
+
+def lock_rois(cameraId, detected_signs):
+    """Pin the confident signal heads of a full detection as the camera's ROIs"""
+    rois = [detection['bbox'] for detection in detected_signs
+            if detection['confidence'] >= ROI_LOCK_CONFIDENCE and detection['class'] in LAMP_CLASSES.values()]
+    if not rois:
+        return
+    if cameraId not in roi_locks:
+        roi_stats['locks'] += 1
+        print(f"Camera {cameraId}: locked {len(rois)} signal head ROI(s)")
+    roi_locks[cameraId] = {'rois': rois, 'locked_at': time.time()}
+
+def unlock_rois(cameraId, reason):
+    if roi_locks.pop(cameraId, None) is not None:
+        roi_stats['unlocks'] += 1
+        print(f"Camera {cameraId}: ROI lock released ({reason}), running full detection")
+
+def classify_lamp(roi):
+    """
+    Vectorized HSV lit-lamp test on a BGR signal-head crop
+    Returns:
+        (color, confidence): the hue with the most bright saturated pixels and its share
+        of them, or (None, 0.0) if too few pixels are lit to call a lamp on
+    """
+    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+    hue, saturation, value = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    lit = (saturation >= LIT_MIN_SATURATION) & (value >= LIT_MIN_VALUE)
+    lit_count = int(np.count_nonzero(lit))
+    if lit_count < LIT_MIN_FRACTION * lit.size:
+        return None, 0.0
+
+    votes = dict()
+    for color, ranges in LAMP_HUES.items():
+        in_range = np.zeros_like(lit)
+        for low, high in ranges:
+            in_range |= (hue >= low) & (hue <= high)
+        votes[color] = int(np.count_nonzero(lit & in_range))
+    color = max(votes, key=votes.get)
+    return color, votes[color] / lit_count
+
+def classify_rois(frame, lock):
+    """
+    Classify every pinned ROI of a frame by color
+    Returns:
+        Detections in the detector's format, or None if any ROI is not confidently lit
+    """
+    height, width = frame.shape[:2]
+    detected_signs = []
+    for bbox in lock['rois']:
+        pad_x = bbox['width'] * ROI_PADDING
+        pad_y = bbox['height'] * ROI_PADDING
+        x1 = max(0, int((bbox['x1'] - pad_x) * width))
+        y1 = max(0, int((bbox['y1'] - pad_y) * height))
+        x2 = min(width, int((bbox['x2'] + pad_x) * width))
+        y2 = min(height, int((bbox['y2'] + pad_y) * height))
+        if x2 <= x1 or y2 <= y1:
+            return None
+
+        color, confidence = classify_lamp(frame[y1:y2, x1:x2])
+        if color is None or confidence < ROI_MIN_CONFIDENCE:
+            return None
+        detected_signs.append({'class': LAMP_CLASSES[color], 'confidence': float(confidence), 'bbox': bbox})
+    return detected_signs
+
+def handle_detections(frame_data, detected_signs, inference_time, source):
+    """Log one frame's result and emit it, through the phase tracker when enabled"""
+    frame, cameraId, imageId, created_at = frame_data
+    height, width = frame.shape[:2]
+
+    # Print message whether objects were detected or not
+    if source == 'detector':
+        if detected_signs:
+            print(f"Traffic Sign Detection: {len(detected_signs)} signs detected")
+        else:
+            print("Traffic Sign Detection: No traffic signs detected in this frame")
+
+    # Prepare response with detection results
+    if len(detected_signs) == 0:
+        return
+    max_confidence = max(detected_signs, key=lambda x: x['confidence'])
+    traffic_status = max_confidence['class']
+
+    response = {
+        'cameraId': cameraId,
+        'imageId': imageId,
+        'traffic_status': traffic_status,
+        'detections': detected_signs,
+        'inference_time': inference_time,
+        'source': source,
+        'image_dimensions': {
+            'width': width,
+            'height': height
+        },
+        'created_at': created_at,
+    }
+
+    if ENABLE_PHASE_TRACKING:
+        phase_event = phase_trackers.setdefault(cameraId, PhaseTracker()).update(traffic_status, created_at)
+        if phase_event is None:
+            return
+        response.update(phase_event)
+        if ENABLE_CYCLE_PREDICTION and phase_event['event'] == 'transition':
+            signal_cycles.setdefault(cameraId, SignalCycle()).observe(phase_event)
+        if ENABLE_PHASE_TIMELINE:
+            phase_timeline.record(str(cameraId), traffic_status, phase_event)
+
+    # Emit detection results back to the server
+    sio.emit('traffic_light', response)
+    if source == 'detector':
+        print(f"Detected {len(detected_signs)} traffic signs, inference time: {inference_time:.2f}ms")
+
 def process_frames_thread():
     """Thread function to process frames with the model in the background"""
     global running, model
@@ -47,101 +449,46 @@ def process_frames_thread():
     
     while running:
         try:
-            # Try to get a frame from the model queue, non-blocking
-            try:
-                frame_data = model_frame_queue.get(block=False)
-                if frame_data is None:
-                    time.sleep(0.01)
-                    continue
-            except queue.Empty:
-                time.sleep(0.01)
+            # Take the next round of frames across cameras
+            batch = frame_scheduler.get_batch(MAX_BATCH_SIZE, timeout=0.1)
+            if not batch:
                 continue
             
-            frame, cameraId, imageId, created_at = frame_data
-            
             # Skip processing if model isn't loaded
             if model is None:
                 time.sleep(0.01)
                 continue
-                
-            # Process the frame with YOLO
-            start_time = time.time()
-            results = model(frame, verbose=False)
-            inference_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-            
-            height, width = frame.shape[:2]
-            
-            # Process detection results
-            detected_signs = []
-            
-            has_detections = False  # Flag to track if any objects were detected
-            
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    confidence = float(box.conf[0])
-                    cls_id = int(box.cls[0])
-                    
-                    # Check if the detected object meets confidence threshold
-                    if confidence >= CONFIDENCE_THRESHOLD:
-                        has_detections = True
-                        # Get bounding box coordinates
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        
-                        class_name = model.names[cls_id]
-                        
-                        # Calculate relative coordinates (0-1 range)
-                        rel_x1 = x1 / width
-                        rel_y1 = y1 / height
-                        rel_x2 = x2 / width
-                        rel_y2 = y2 / height
-                        
-                        # Add detection to results
-                        detection_info = {
-                            'class': class_name,
-                            'confidence': float(confidence),
-                            'bbox': {
-                                'x1': float(rel_x1),  # Normalized coordinates (0-1)
-                                'y1': float(rel_y1),
-                                'x2': float(rel_x2),
-                                'y2': float(rel_y2),
-                                'width': float(rel_x2 - rel_x1),
-                                'height': float(rel_y2 - rel_y1)
-                            }
-                        }
-                        
-                        detected_signs.append(detection_info)
-            
-            # Print message whether objects were detected or not
-            if has_detections:
-                print(f"Traffic Sign Detection: {len(detected_signs)} signs detected")
-            else:
-                print("Traffic Sign Detection: No traffic signs detected in this frame")
-            
-            # Prepare response with detection results
-            if len(detected_signs) > 0:
-                max_confidence = max(detected_signs, key=lambda x: x['confidence'])
-                traffic_status = max_confidence['class']
-
-                response = {
-                    'cameraId': cameraId,
-                    'imageId': imageId,
-                    'traffic_status': traffic_status,
-                    'detections': detected_signs,
-                    'inference_time': inference_time,
-                    'image_dimensions': {
-                        'width': width,
-                        'height': height
-                    },
-                    'created_at': created_at,
-                }
 
-                # Emit detection results back to the server
-                sio.emit('traffic_light', response)
-                print(f"Detected {len(detected_signs)} traffic signs, inference time: {inference_time:.2f}ms")
-            else:
-                continue
+            # Locked cameras only classify their signal heads until the lock goes stale or unsure
+            needs_detector = []
+            for frame_data in batch:
+                frame, cameraId = frame_data[0], frame_data[1]
+                lock = roi_locks.get(cameraId) if ENABLE_ROI_LOCK else None
+                if lock is None:
+                    needs_detector.append(frame_data)
+                    continue
+                if time.time() - lock['locked_at'] >= ROI_REDETECT_INTERVAL:
+                    roi_locks.pop(cameraId, None)  # Periodic refresh, re-locked below
+                    needs_detector.append(frame_data)
+                    continue
+                start_time = time.time()
+                detected_signs = classify_rois(frame, lock)
+                inference_time = (time.time() - start_time) * 1000
+                if detected_signs is None:
+                    unlock_rois(cameraId, "low color confidence")
+                    needs_detector.append(frame_data)
+                    continue
+                roi_stats['roi_frames'] += 1
+                handle_detections(frame_data, detected_signs, inference_time, 'roi')
 
+            # Everything else goes through the detector as one batch
+            if needs_detector:
+                batch_signs, inference_time = detect_traffic_lights([frame_data[0] for frame_data in needs_detector])
+                for frame_data, detected_signs in zip(needs_detector, batch_signs):
+                    if ENABLE_ROI_LOCK:
+                        lock_rois(frame_data[1], detected_signs)
+                    roi_stats['detector_frames'] += 1
+                    handle_detections(frame_data, detected_signs, inference_time, 'detector')
                     
         except Exception as e:
             print(f"Error in processing thread: {e}")
@@ -173,7 +520,8 @@ def load_model():
 
         # Load the model with the selected device
         print(f"Loading model on device: {device}")
-        model = YOLO(model_path)
+        # Fused artifact with memory-mapped weights, shared by every process on this host
+        model = model_registry.get(model_path, lambda: load_shared(model_path, YOLO, lambda m: m.model))
         model.to(device)
         print(f"Model loaded successfully! Running on: {device}")
         print(f"Available classes: {model.names}")
@@ -204,6 +552,14 @@ def disconnect():
     print("Disconnected from Socket.IO server")
     print("Will attempt to reconnect automatically...")
 
+@sio.on('traffic_light_phase')
+def on_traffic_light_phase(data):
+    """Request-response phase lookup, the ack carries the result (see PhaseTimeline.query)"""
+    try:
+        return phase_timeline.query(data or {})
+    except (ValueError, TypeError) as e:
+        return {'error': str(e)}
+
 # Function to handle connection management
 def maintain_connection():
     global connected, running
@@ -225,19 +581,26 @@ def maintain_connection():
 # Image processing function
 @sio.on('image')
 def on_image(data):
-    global last_frame_time
-    
-    # Limit frame processing rate to avoid overload
+    image = data['buffer']
+    cameraId = data['cameraId']
+
+    # Limit each camera to its own frame rate so busy cameras don't crowd out the others
     current_time = time.time()
-    if current_time - last_frame_time < 1.0/MAX_FPS:
+    if current_time - last_frame_times.get(cameraId, 0) < 1.0/CAMERA_TARGET_FPS:
+        frame_scheduler.camera_stats(cameraId)['throttled'] += 1
         return  # Skip this frame to maintain reasonable frame rate
     
-    last_frame_time = current_time
+    last_frame_times[cameraId] = current_time
 
-    image = data['buffer']
-    cameraId = data['cameraId']
     imageId = data['imageId']
     created_at = data['created_at']
+
+    # Mid-phase of a learned cycle, most frames can't show anything new
+    if ENABLE_PHASE_TRACKING and ENABLE_CYCLE_PREDICTION:
+        cycle = signal_cycles.setdefault(cameraId, SignalCycle())
+        if not cycle.should_sample(phase_trackers.get(cameraId), created_at):
+            frame_scheduler.camera_stats(cameraId)['predicted'] += 1
+            return
     
     try:
         # Convert image data from buffer to numpy array
@@ -275,12 +638,8 @@ def on_image(data):
             scale = max_dimension / max(width, height)
             frame = cv2.resize(frame, (int(width * scale), int(height * scale)))
         
-        # Add the frame to the model processing queue
-        try:
-            model_frame_queue.put((frame.copy(), cameraId, imageId, created_at), block=False)
-        except queue.Full:
-            # If model queue is full, just discard this frame for processing
-            pass
+        # Add the frame to the camera's mailbox, replacing its oldest frame if it is full
+        frame_scheduler.put(cameraId, (frame, cameraId, imageId, created_at))
     
     except Exception as e:
         print(f"Error processing image: {e}")
@@ -293,6 +652,12 @@ def main():
         print("Failed to load model. Exiting...")
         return
     
+    if ENABLE_PHASE_TRACKING and ENABLE_PHASE_TIMELINE:
+        try:
+            serve_phase_timeline(phase_timeline, PHASE_TIMELINE_HOST, PHASE_TIMELINE_PORT)
+        except OSError as e:
+            print(f"Could not serve phase timeline: {e}")
+    
     # Start connection manager thread
     connection_thread = threading.Thread(target=maintain_connection, daemon=True)
     connection_thread.start()
@@ -316,6 +681,9 @@ def main():
         
         # Wait for thread to finish
         processing_thread.join(timeout=2)
+        if ENABLE_ROI_LOCK:
+            print(f"ROI lock stats: {roi_stats}")
+        print(f"Camera scheduling stats: {frame_scheduler.stats}")
         
         print("Application stopped.")
 